@@ -4,16 +4,19 @@ from __future__ import annotations
 
 import asyncio
 from collections import defaultdict
+from collections.abc import Iterable
 from functools import partial
-from typing import Literal, cast
+from typing import Any, Literal, cast
 
+from jupyter_events import EventLogger
 from jupyter_server.extension.application import ExtensionApp
 from jupyter_ydoc import ydocs as YDOCS
 from jupyter_ydoc.ybasedoc import YBaseDoc
 from pycrdt import Doc
 from pycrdt.store import BaseYStore
-from traitlets import Bool, Float, Type, Unicode
+from traitlets import Bool, Float, Int, List, Type, Unicode
 
+from .caches import SourceUpdateCache
 from .handlers import (
     DocForkHandler,
     DocSessionHandler,
@@ -23,17 +26,23 @@ from .handlers import (
 )
 from .loaders import FileLoaderMapping
 from .rooms import DocumentRoom
+from .schedulers import RoomInitializationScheduler, SaveScheduler
 from .stores import SQLiteYStore
 from .utils import (
     AWARENESS_EVENTS_SCHEMA_PATH,
+    CONTENTS_EVENTS_URI,
     EVENTS_SCHEMA_PATH,
     FORK_EVENTS_SCHEMA_PATH,
     decode_file_path,
     encode_file_path,
     room_id_from_encoded_path,
 )
+from .watchers import BaseFileWatcher
 from .websocketserver import JupyterWebsocketServer, RoomNotFound, exception_logger
 
+# The format of the documents of each content type, as requested by the frontend
+FILE_FORMATS = {"notebook": "json", "file": "text", "blob": "base64"}
+
 
 class YDocExtension(ExtensionApp):
     name = "jupyter_server_ydoc"
@@ -52,6 +61,26 @@ class YDocExtension(ExtensionApp):
         saving changes from the front-end.""",
     )
 
+    file_poll_max_interval = Float(
+        None,
+        allow_none=True,
+        config=True,
+        help="""The maximum period in seconds to check for changes of a file on disk. The period
+        of a file doubles after each check without changes, from file_poll_interval up to this
+        maximum, and it is reset when the file changes, is saved, or a client connects to it.
+        Defaults to None (files are checked every file_poll_interval).""",
+    )
+
+    file_path_cache_ttl = Float(
+        5,
+        allow_none=True,
+        config=True,
+        help="""The duration in seconds to cache the path of a file, instead of asking the file ID
+        manager for it on each access. The cached paths are also invalidated when files are
+        renamed or deleted through the contents manager. Defaults to 5s, if None then the paths
+        are not cached.""",
+    )
+
     file_stop_poll_on_errors_after = Float(
         24 * 60 * 60,
         allow_none=True,
@@ -60,6 +89,29 @@ class YDocExtension(ExtensionApp):
         Defaults to 24 hours, if None then polling will not stop on errors.""",
     )
 
+    contents_manager_threads = Int(
+        None,
+        allow_none=True,
+        config=True,
+        help="""Number of threads running the calls to a synchronous contents manager, so that
+        its I/O doesn't block the event loop; the calls wait for a free thread. The contents
+        manager must then be thread-safe, which synchronous contents managers are not documented
+        to be. The calls to an asynchronous contents manager run on the event loop. Defaults to
+        None (the calls to a synchronous contents manager run on the event loop).""",
+    )
+
+    file_watcher_class = Type(
+        default_value=None,
+        klass=BaseFileWatcher,
+        allow_none=True,
+        config=True,
+        help="""The file watcher class notifying the changes of files on the local disk, which are
+        then detected without polling them. It is only used with contents managers storing files on
+        the local disk, the other files are polled. Defaults to None (files are polled). For
+        instance 'jupyter_server_ydoc.watchers.WatchfilesFileWatcher', which requires the
+        watchfiles package.""",
+    )
+
     document_cleanup_delay = Float(
         60,
         allow_none=True,
@@ -76,6 +128,47 @@ class YDocExtension(ExtensionApp):
         Defaults to 1s, if None then the document will never be saved.""",
     )
 
+    document_save_max_wait = Float(
+        None,
+        allow_none=True,
+        config=True,
+        help="""The maximum delay in seconds between the first unsaved change made to a document
+        and its save, so that a document being continuously edited is still saved. Defaults to
+        None (a document is only saved once it isn't changed for 'document_save_delay').""",
+    )
+
+    document_save_min_interval = Float(
+        None,
+        allow_none=True,
+        config=True,
+        help="""The minimum interval in seconds between two automatic saves of a document.
+        Defaults to None (no minimum interval).""",
+    )
+
+    document_save_cost_factor = Float(
+        0,
+        config=True,
+        help="""Factor applied to the duration of the last save of a document, which is the
+        minimum delay before its next automatic save. This makes expensive documents save less
+        often. Defaults to 0 (the duration of the saves is not taken into account).""",
+    )
+
+    document_save_delay_per_mb = Float(
+        0,
+        config=True,
+        help="""Delay in seconds added to 'document_save_delay' for each MB of the saved file.
+        Defaults to 0 (the size of the file is not taken into account).""",
+    )
+
+    document_save_concurrency = Int(
+        8,
+        allow_none=True,
+        config=True,
+        help="""Maximum number of documents saved at the same time across all rooms. Saves
+        requested while another save of the same document is pending are merged into it.
+        Defaults to 8, if None then each room saves its document on its own.""",
+    )
+
     document_load_progressively = Bool(
         False,
         config=True,
@@ -92,6 +185,93 @@ class YDocExtension(ExtensionApp):
         progressive document loading. Set to None to keep loading outputs with the inputs.""",
     )
 
+    document_build_offload_threshold_mb = Float(
+        None,
+        allow_none=True,
+        config=True,
+        help="""File size in MB above which a shared document is built from its source file in
+        a worker thread, so that loading a large document doesn't block the event loop. Only the
+        final update is applied to the shared document on the event loop. Defaults to None
+        (documents are always built on the event loop).""",
+    )
+
+    document_save_offload_threshold_mb = Float(
+        None,
+        allow_none=True,
+        config=True,
+        help="""Document size in MB above which the content of a shared document is read in a
+        worker thread when it is saved, so that saving a large document doesn't block the event
+        loop. Only an update of the document is encoded on the event loop. Defaults to None
+        (the content is always read on the event loop).""",
+    )
+
+    source_update_cache_size_mb = Float(
+        64,
+        config=True,
+        help="""Maximum size in MB of the Y updates built from source files that are kept in
+        memory, so that documents reopened with identical content are not built again.
+        Defaults to 64MB, if 0 then the updates are not cached in memory.""",
+    )
+
+    source_update_cache_dir = Unicode(
+        None,
+        allow_none=True,
+        config=True,
+        help="""Directory where the Y updates built from source files are cached on disk, so
+        that they can be reused across server restarts. Defaults to None (the updates are not
+        cached on disk).""",
+    )
+
+    source_update_cache_dir_size_mb = Float(
+        1024,
+        config=True,
+        help="""Maximum size in MB of the Y updates cached on disk in
+        'source_update_cache_dir'. Defaults to 1024MB.""",
+    )
+
+    prewarm_documents = List(
+        Unicode(),
+        default_value=[],
+        config=True,
+        help="""Documents loaded in memory in the background at server start, so that the
+        first clients connecting to them find an initialized room. Documents are given as
+        '<format>:<type>:<path>', e.g. 'json:notebook:path/to/notebook.ipynb'. The documents
+        no client opens are removed from memory after 'document_cleanup_delay'.""",
+    )
+
+    prewarm_recent_documents = Int(
+        0,
+        config=True,
+        help="""Number of the most recently updated documents in the YStore loaded in memory
+        in the background at server start, in addition to 'prewarm_documents'. Only supported
+        with an SQLiteYStore. Defaults to 0 (no recent document is loaded).""",
+    )
+
+    prewarm_concurrency = Int(
+        4,
+        config=True,
+        help="""Maximum number of documents loaded concurrently at server start.
+        Defaults to 4.""",
+    )
+
+    room_initialization_concurrency = Int(
+        8,
+        allow_none=True,
+        config=True,
+        help="""Maximum number of rooms initializing at the same time. Clients opening other
+        rooms wait for an initialization to finish, the rooms with the most waiting clients
+        first. Defaults to 8, if None then the number of rooms is not limited.""",
+    )
+
+    room_initialization_queue_size = Int(
+        1000,
+        allow_none=True,
+        config=True,
+        help="""Maximum number of clients waiting to initialize a room. Clients above this
+        limit are disconnected and reconnect later. Defaults to 1000, if None then the number
+        of waiting clients is not limited.""",
+    )
+
     ystore_class = Type(
         default_value=SQLiteYStore,
         klass=BaseYStore,
@@ -121,6 +301,10 @@ class YDocExtension(ExtensionApp):
     )
 
     _room_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+    _prewarming: asyncio.Task | None = None
+    # Keeps the database connection shared by the stores open while the server runs
+    _ystore: SQLiteYStore | None = None
+    _ystore_task: asyncio.Task | None = None
 
     def initialize(self):
         super().initialize()
@@ -169,6 +353,31 @@ class YDocExtension(ExtensionApp):
             self.log,
             self.file_poll_interval,
             file_stop_poll_on_errors_after=self.file_stop_poll_on_errors_after,
+            file_watcher_class=self.file_watcher_class,
+            file_poll_max_interval=self.file_poll_max_interval,
+            file_path_cache_ttl=self.file_path_cache_ttl,
+            contents_manager_threads=self.contents_manager_threads,
+        )
+        self.serverapp.event_logger.add_listener(
+            schema_id=CONTENTS_EVENTS_URI, listener=self._on_contents_event
+        )
+
+        self.source_update_cache: SourceUpdateCache | None = None
+        if self.source_update_cache_size_mb > 0 or self.source_update_cache_dir:
+            self.source_update_cache = SourceUpdateCache(
+                int(self.source_update_cache_size_mb * 1024 * 1024),
+                cache_dir=self.source_update_cache_dir,
+                max_disk_size=int(self.source_update_cache_dir_size_mb * 1024 * 1024),
+                log=self.log,
+            )
+
+        self.save_scheduler: SaveScheduler | None = None
+        if self.document_save_concurrency is not None:
+            self.save_scheduler = SaveScheduler(self.document_save_concurrency)
+
+        self.room_initialization_scheduler = RoomInitializationScheduler(
+            self.room_initialization_concurrency,
+            max_queue_size=self.room_initialization_queue_size,
         )
 
         self.handlers.extend(
@@ -186,11 +395,24 @@ class YDocExtension(ExtensionApp):
                     {
                         "document_cleanup_delay": self.document_cleanup_delay,
                         "document_save_delay": self.document_save_delay,
+                        "document_save_max_wait": self.document_save_max_wait,
+                        "document_save_min_interval": self.document_save_min_interval,
+                        "document_save_cost_factor": self.document_save_cost_factor,
+                        "document_save_delay_per_mb": self.document_save_delay_per_mb,
                         "document_load_progressively": self.document_load_progressively,
                         "notebook_output_delay_threshold_mb": (
                             self.notebook_output_delay_threshold_mb
                         ),
                         "file_loaders": self.file_loaders,
+                        "source_update_cache": self.source_update_cache,
+                        "document_build_offload_threshold_mb": (
+                            self.document_build_offload_threshold_mb
+                        ),
+                        "document_save_offload_threshold_mb": (
+                            self.document_save_offload_threshold_mb
+                        ),
+                        "initialization_scheduler": self.room_initialization_scheduler,
+                        "save_scheduler": self.save_scheduler,
                         "ystore_class": ystore_class,
                         "ywebsocket_server": self.ywebsocket_server,
                         "room_locks": self._room_locks,
@@ -284,11 +506,20 @@ class YDocExtension(ExtensionApp):
                     save_delay=self.document_save_delay,
                     document_load_progressively=self.document_load_progressively,
                     notebook_output_delay_threshold_mb=self.notebook_output_delay_threshold_mb,
+                    source_update_cache=self.source_update_cache,
+                    document_build_offload_threshold_mb=self.document_build_offload_threshold_mb,
+                    document_save_offload_threshold_mb=self.document_save_offload_threshold_mb,
+                    save_max_wait=self.document_save_max_wait,
+                    save_min_interval=self.document_save_min_interval,
+                    save_cost_factor=self.document_save_cost_factor,
+                    save_delay_per_mb=self.document_save_delay_per_mb,
+                    save_scheduler=self.save_scheduler,
                 )
                 try:
                     await self.ywebsocket_server.start_room(room)
                     self.ywebsocket_server.add_room(room_id, room)
-                    await room.initialize()
+                    async with self.room_initialization_scheduler.admit(room_id):
+                        await room.initialize()
                     self.log.info(f"Created and started room: {room_id}")
                 except Exception as e:
                     self.log.error("Room %s failed to start on websocket server", room_id)
@@ -318,7 +549,163 @@ class YDocExtension(ExtensionApp):
 
         return None
 
+    async def prewarm(
+        self,
+        documents: Iterable[str] = (),
+        recent_documents: int = 0,
+        concurrency: int = 4,
+    ) -> list[str]:
+        """Load documents in memory, so that the first clients connecting to them
+        find an initialized room.
+
+        Documents are given as '<format>:<type>:<path>'. The ``recent_documents`` most
+        recently updated documents in the YStore are loaded too. At most ``concurrency``
+        documents are loaded at the same time. The rooms no client joins are deleted after
+        ``document_cleanup_delay``, as when their last client leaves.
+
+        Returns the IDs of the rooms that were loaded.
+        """
+        file_id_manager = self.serverapp.web_app.settings["file_id_manager"]
+        room_ids = []
+        for document in documents:
+            file_format, file_type, path = decode_file_path(document)
+            file_id = file_id_manager.index(path)
+            if file_id is None:
+                self.log.warning("Cannot prewarm document %s: file not found", document)
+                continue
+            room_ids.append(
+                room_id_from_encoded_path(encode_file_path(file_format, file_type, file_id))
+            )
+        if recent_documents > 0:
+            room_ids.extend(await self._get_recent_room_ids(recent_documents))
+
+        semaphore = asyncio.Semaphore(concurrency)
+        prewarmed = []
+
+        async def prewarm_room(room_id: str) -> None:
+            async with semaphore:
+                try:
+                    await self.get_document(room_id=room_id, copy=False, create=True)
+                    room = await self.ywebsocket_server.get_room(room_id)
+                # a document failing to load, for any reason, doesn't stop the prewarming
+                except Exception as e:  # noqa: BLE001
+                    self.log.warning("Failed to prewarm room %s: %r", room_id, e)
+                else:
+                    prewarmed.append(room_id)
+                    # clean the room like after its last client left, if no client joins it
+                    if (
+                        isinstance(room, DocumentRoom)
+                        and not room.clients
+                        and room.cleaner is None
+                        and self.document_cleanup_delay is not None
+                    ):
+                        room.cleaner = asyncio.create_task(self._clean_room(room_id, room))
+
+        # a document may be both configured and recently updated
+        await asyncio.gather(*(prewarm_room(room_id) for room_id in dict.fromkeys(room_ids)))
+        self.log.info("Prewarmed %d rooms", len(prewarmed))
+        return prewarmed
+
+    async def _clean_room(self, room_id: str, room: DocumentRoom) -> None:
+        """
+        Deletes a room without clients and its file loader, after the cleanup delay.
+
+        The clients joining the room cancel its cleaner task.
+
+            Parameters:
+                room_id (str): The ID of the room.
+                room (DocumentRoom): The room.
+        """
+        assert self.document_cleanup_delay is not None
+        await asyncio.sleep(self.document_cleanup_delay)
+
+        async with self._room_locks[room_id]:
+            if room.clients:
+                return
+            await self.ywebsocket_server.delete_document_room(room_id, room, self.file_loaders)
+            del self._room_locks[room_id]
+
+    async def _get_recent_room_ids(self, limit: int) -> list[str]:
+        """Returns the IDs of the rooms of the most recently updated documents in the YStore."""
+        if not issubclass(self.ystore_class, SQLiteYStore):
+            self.log.warning("Cannot prewarm recent documents with %s", self.ystore_class.__name__)
+            return []
+
+        # the store is only used to query the database, it is not bound to a document
+        ystore = self.ystore_class(path="", log=self.log, config=self.config)
+        asyncio.create_task(ystore.start())
+        await ystore.started.wait()
+        try:
+            paths = await ystore.get_recent_paths(limit)
+        finally:
+            await ystore.stop()
+
+        file_id_manager = self.serverapp.web_app.settings["file_id_manager"]
+        room_ids = []
+        for path in paths:
+            # the updates of a document are stored as '.<type>:<file id>.y'
+            file_type, _, file_id = path.removeprefix(".").removesuffix(".y").partition(":")
+            file_format = FILE_FORMATS.get(file_type)
+            if file_format is None or file_id_manager.get_path(file_id) is None:
+                continue
+            room_ids.append(
+                room_id_from_encoded_path(encode_file_path(file_format, file_type, file_id))
+            )
+        return room_ids
+
+    async def _on_contents_event(
+        self, logger: EventLogger, schema_id: str, data: dict[str, Any]
+    ) -> None:
+        """
+        Invalidates the cached file paths when files are moved by the contents manager.
+        """
+        if data["action"] in {"rename", "delete"}:
+            self.file_loaders.invalidate_paths()
+
+    async def _start_jupyter_server_extension(self, serverapp):
+        if issubclass(self.ystore_class, SQLiteYStore):
+            ystore = self.ystore_class(path="", log=self.log, config=self.config)
+            if ystore.shared_connection:
+                await self._open_ystore_database(ystore)
+        if self.prewarm_documents or self.prewarm_recent_documents > 0:
+            self._prewarming = asyncio.create_task(
+                self.prewarm(
+                    self.prewarm_documents,
+                    recent_documents=self.prewarm_recent_documents,
+                    concurrency=self.prewarm_concurrency,
+                )
+            )
+
+    async def _open_ystore_database(self, ystore: SQLiteYStore) -> None:
+        """
+        Opens the connection to the database shared by the stores of the documents, and
+        checks its schema before any room uses it.
+
+            Parameters:
+                ystore (SQLiteYStore): The store keeping the connection open.
+        """
+        task = asyncio.create_task(ystore.start())
+        await ystore.started.wait()
+        assert ystore.db_initialized is not None
+        initialized = asyncio.create_task(ystore.db_initialized.wait())
+        # the store stops if the database cannot be opened
+        await asyncio.wait([initialized, task], return_when=asyncio.FIRST_COMPLETED)
+        if initialized.done():
+            self._ystore, self._ystore_task = ystore, task
+            return
+
+        initialized.cancel()
+        try:
+            task.result()
+        # the error of the database is raised in an exception group of the store's task group,
+        # and the server must start without the shared connection whatever the error
+        except Exception as e:  # noqa: BLE001
+            self.log.error("Cannot open the YStore database %s: %s", ystore.db_path, e, exc_info=e)
+
     async def stop_extension(self):
+        self.serverapp.event_logger.remove_listener(listener=self._on_contents_event)
+        if self._prewarming is not None:
+            self._prewarming.cancel()
         # Cancel tasks and clean up
         await asyncio.wait(
             [
@@ -327,3 +714,7 @@ class YDocExtension(ExtensionApp):
             ],
             timeout=3,
         )
+        if self._ystore is not None:
+            await self._ystore.stop()
+        if self._ystore_task is not None:
+            await self._ystore_task
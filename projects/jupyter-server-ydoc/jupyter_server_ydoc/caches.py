@@ -0,0 +1,228 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from logging import Logger, getLogger
+from pathlib import Path
+from uuid import uuid4
+
+from jupyter_ydoc import __version__ as jupyter_ydoc_version
+
+CACHE_FILE_SUFFIX = ".y"
+
+
+class SourceUpdateCache:
+    """
+    A bounded cache of the Y updates built from source contents.
+
+    Rooms created from the content on disk build their document with a deterministic
+    update, which is always the same for identical content. The updates are cached in
+    memory, and optionally on disk, keyed by the content hash and the document type,
+    so that they can be applied directly instead of being built again.
+
+    Both caches evict the least recently used updates when they exceed their size.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        cache_dir: str | None = None,
+        max_disk_size: int = 0,
+        log: Logger | None = None,
+    ) -> None:
+        """
+        Args:
+            max_size: Maximum size in bytes of the updates kept in memory
+            cache_dir: [optional] Directory where updates are cached on disk;
+                default the updates are only cached in memory
+            max_disk_size: [optional] Maximum size in bytes of the updates kept on disk
+            log: [optional] Server log; default to local logger
+        """
+        self._max_size = max_size
+        self._cache_dir = Path(cache_dir).expanduser() if cache_dir else None
+        self._max_disk_size = max_disk_size
+        self._log = log or getLogger(__name__)
+
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._disk_entries: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self._cache_dir is not None:
+            self._load_disk_entries()
+
+    @property
+    def size(self) -> int:
+        """
+        The size in bytes of the updates cached in memory.
+        """
+        return self._size
+
+    @property
+    def disk_size(self) -> int:
+        """
+        The size in bytes of the updates cached on disk.
+        """
+        return self._disk_size
+
+    @staticmethod
+    def key(file_format: str, file_type: str, hash: str, hash_algorithm: str | None = None) -> str:
+        """
+        Returns the cache key of a source content.
+
+        The key also depends on the version of jupyter_ydoc, as it defines how the
+        content is laid out in the document.
+
+            Parameters:
+                file_format (str): File format.
+                file_type (str): Content type.
+                hash (str): Hash of the content, as computed by the contents manager.
+                hash_algorithm (str): [optional] Algorithm used to compute the hash.
+
+            Returns:
+                key (str): The cache key.
+        """
+        key = ":".join((jupyter_ydoc_version, file_format, file_type, hash_algorithm or "", hash))
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Returns the cached update for a key, or None if it isn't cached.
+
+            Parameters:
+                key (str): The cache key.
+        """
+        update = self._entries.get(key)
+        if update is not None:
+            self._entries.move_to_end(key)
+        elif key in self._disk_entries:
+            update = await self._read_from_disk(key)
+            if update is not None:
+                self._add(key, update)
+
+        if update is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return update
+
+    async def set(self, key: str, update: bytes) -> None:
+        """
+        Caches the update for a key.
+
+            Parameters:
+                key (str): The cache key.
+                update (bytes): The Y update built from the source content.
+        """
+        self._add(key, update)
+        if self._cache_dir is not None and key not in self._disk_entries:
+            await self._write_to_disk(key, update)
+
+    def clear(self) -> None:
+        """
+        Clears the updates cached in memory.
+        """
+        self._entries.clear()
+        self._size = 0
+
+    def _add(self, key: str, update: bytes) -> None:
+        if len(update) > self._max_size:
+            return
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+
+        self._entries[key] = update
+        self._size += len(update)
+        while self._size > self._max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def _load_disk_entries(self) -> None:
+        assert self._cache_dir is not None
+        try:
+            files = [
+                entry
+                for entry in os.scandir(self._cache_dir)
+                if entry.is_file() and entry.name.endswith(CACHE_FILE_SUFFIX)
+            ]
+        except OSError:
+            return
+
+        stats = [(entry, entry.stat()) for entry in files]
+        for entry, stat in sorted(stats, key=lambda entry_stat: entry_stat[1].st_mtime):
+            self._disk_entries[entry.name[: -len(CACHE_FILE_SUFFIX)]] = stat.st_size
+            self._disk_size += stat.st_size
+
+    async def _read_from_disk(self, key: str) -> bytes | None:
+        assert self._cache_dir is not None
+        path = self._cache_dir / f"{key}{CACHE_FILE_SUFFIX}"
+
+        def read() -> bytes:
+            update = path.read_bytes()
+            # Keep track of the last use across server restarts
+            os.utime(path)
+            return update
+
+        try:
+            update = await asyncio.to_thread(read)
+        except OSError as e:
+            self._log.warning("Failed to read cached update %s: %s", path, e)
+            self._disk_size -= self._disk_entries.pop(key, 0)
+            return None
+
+        # the update may have been evicted while reading it
+        if key in self._disk_entries:
+            self._disk_entries.move_to_end(key)
+        return update
+
+    async def _write_to_disk(self, key: str, update: bytes) -> None:
+        assert self._cache_dir is not None
+        if len(update) > self._max_disk_size:
+            return
+
+        cache_dir = self._cache_dir
+        path = cache_dir / f"{key}{CACHE_FILE_SUFFIX}"
+
+        def write() -> None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+            tmp_path.write_bytes(update)
+            os.replace(tmp_path, path)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError as e:
+            self._log.warning("Failed to cache update %s: %s", path, e)
+            return
+
+        if key in self._disk_entries:
+            # the same update was written concurrently
+            return
+        self._disk_entries[key] = len(update)
+        self._disk_size += len(update)
+
+        evicted_paths = []
+        while self._disk_size > self._max_disk_size:
+            evicted_key, size = self._disk_entries.popitem(last=False)
+            self._disk_size -= size
+            evicted_paths.append(cache_dir / f"{evicted_key}{CACHE_FILE_SUFFIX}")
+
+        if evicted_paths:
+
+            def remove() -> None:
+                for evicted_path in evicted_paths:
+                    evicted_path.unlink(missing_ok=True)
+
+            await asyncio.to_thread(remove)
@@ -7,6 +7,7 @@ import asyncio
 import json
 import os
 from logging import Logger
+from time import monotonic
 from typing import Any, cast
 from uuid import uuid4
 
@@ -15,14 +16,16 @@ from jupyter_server.auth.decorator import ws_authenticated
 from jupyter_server.base.handlers import APIHandler, JupyterHandler
 from jupyter_server.utils import ensure_async
 from jupyter_ydoc import ydocs as YDOCS
-from pycrdt import Decoder, Doc, Encoder, UndoManager
+from pycrdt import Decoder, Doc, Encoder, UndoManager, YSyncMessageType
 from pycrdt.store import BaseYStore
 from pycrdt.websocket import YRoom
 from tornado import web
 from tornado.websocket import WebSocketHandler
 
+from .caches import SourceUpdateCache
 from .loaders import FileLoaderMapping
 from .rooms import DocumentRoom, TransientRoom
+from .schedulers import AdmissionQueueFull, RoomInitializationScheduler, SaveScheduler
 from .utils import (
     JUPYTER_COLLABORATION_AWARENESS_EVENTS_URI,
     JUPYTER_COLLABORATION_EVENTS_URI,
@@ -34,6 +37,7 @@ from .utils import (
     check_session_compatibility,
     decode_file_path,
     encode_file_path,
+    record_duration,
     room_id_from_encoded_path,
     save_current_session,
 )
@@ -146,6 +150,18 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
                         notebook_output_delay_threshold_mb=(
                             self._notebook_output_delay_threshold_mb
                         ),
+                        source_update_cache=self._source_update_cache,
+                        document_build_offload_threshold_mb=(
+                            self._document_build_offload_threshold_mb
+                        ),
+                        document_save_offload_threshold_mb=(
+                            self._document_save_offload_threshold_mb
+                        ),
+                        save_max_wait=self._document_save_max_wait,
+                        save_min_interval=self._document_save_min_interval,
+                        save_cost_factor=self._document_save_cost_factor,
+                        save_delay_per_mb=self._document_save_delay_per_mb,
+                        save_scheduler=self._save_scheduler,
                     )
 
                 else:
@@ -190,8 +206,17 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
         room_locks: dict[str, asyncio.Lock] | None = None,
         document_cleanup_delay: float | None = 60.0,
         document_save_delay: float | None = 1.0,
+        document_save_max_wait: float | None = None,
+        document_save_min_interval: float | None = None,
+        document_save_cost_factor: float = 0,
+        document_save_delay_per_mb: float = 0,
         document_load_progressively: bool = False,
         notebook_output_delay_threshold_mb: float | None = 100,
+        source_update_cache: SourceUpdateCache | None = None,
+        document_build_offload_threshold_mb: float | None = None,
+        document_save_offload_threshold_mb: float | None = None,
+        initialization_scheduler: RoomInitializationScheduler | None = None,
+        save_scheduler: SaveScheduler | None = None,
     ) -> None:
         self._background_tasks = set()
         # File ID manager cannot be passed as argument as the extension may load after this one
@@ -200,13 +225,24 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
         self._ystore_class = ystore_class
         self._cleanup_delay = document_cleanup_delay
         self._document_save_delay = document_save_delay
+        self._document_save_max_wait = document_save_max_wait
+        self._document_save_min_interval = document_save_min_interval
+        self._document_save_cost_factor = document_save_cost_factor
+        self._document_save_delay_per_mb = document_save_delay_per_mb
         self._document_load_progressively = document_load_progressively
         self._notebook_output_delay_threshold_mb = notebook_output_delay_threshold_mb
+        self._source_update_cache = source_update_cache
+        self._document_build_offload_threshold_mb = document_build_offload_threshold_mb
+        self._document_save_offload_threshold_mb = document_save_offload_threshold_mb
+        self._initialization_scheduler = initialization_scheduler
+        self._save_scheduler = save_scheduler
         self._websocket_server = ywebsocket_server
         self._message_queue = asyncio.Queue()
         self._room_id = ""
         self.room = None  # type:ignore
         self._room_locks = room_locks if room_locks is not None else {}
+        self._timings: dict[str, float] = {}
+        self._opened_at: float | None = None
 
     @property
     def path(self):
@@ -248,6 +284,7 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
         On connection open.
         """
         if isinstance(self.room, DocumentRoom):
+            self._opened_at = monotonic()
             # Close the connection if the document session expired
             session_id = self.get_query_argument("sessionId", "")
             root_dir = self.settings.get("server_root_dir", os.getcwd())
@@ -289,8 +326,17 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
 
             try:
                 # Initialize the room
-                async with self._room_lock(self._room_id):
-                    await self.room.initialize()
+                with record_duration(self._timings, "room_initialize"):
+                    if self._initialization_scheduler is None or self.room.ready:
+                        async with self._room_lock(self._room_id):
+                            await self.room.initialize()
+                    else:
+                        async with self._initialization_scheduler.admit(self._room_id) as wait_time:
+                            self._timings["admission_wait"] = wait_time
+                            async with self._room_lock(self._room_id):
+                                await self.room.initialize()
+                # poll the file at the base interval while it is edited
+                self.room._file.mark_active()
                 self.create_task(self._websocket_server.serve(self))
                 self._emit_awareness_event(self.current_user.username, "join")
             except Exception as e:
@@ -298,7 +344,11 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
                 file = self._file_loaders[file_id]
 
                 # Close websocket and propagate error.
-                if isinstance(e, web.HTTPError):
+                if isinstance(e, AdmissionQueueFull):
+                    # the client is expected to reconnect later
+                    self.log.warning(f"Cannot initialize {file.path}: {e}")
+                    self.close(1013, "Try again later.")
+                elif isinstance(e, web.HTTPError):
                     if e.status_code == 404:
                         error_code = 4404  # custom code for "file not found"
                         self.log.error(f"File {file.path} not found.\n{e!r}", exc_info=e)
@@ -337,7 +387,7 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
                     self._cleanup_delay = 0
                     await self._clean_room()
 
-            self._emit(LogLevel.INFO, "initialize", "New client connected.")
+            self._emit(LogLevel.INFO, "initialize", "New client connected.", timings=self._timings)
         else:
             self.create_task(self._websocket_server.serve(self))
             if self._room_id != "JupyterLab:globalAwareness":
@@ -352,6 +402,20 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
             self.write_message(message, binary=True)
         except Exception as e:
             self.log.error("Failed to write message", exc_info=e)
+            return
+
+        if self._opened_at is not None and message[:2] == bytes(
+            [MessageType.SYNC, YSyncMessageType.SYNC_STEP2]
+        ):
+            # the client received the whole document for the first time
+            self._timings["first_sync"] = monotonic() - self._opened_at
+            self._opened_at = None
+            self._emit(
+                LogLevel.INFO,
+                "initialize",
+                "Document synchronized with the client.",
+                timings={"first_sync": self._timings["first_sync"]},
+            )
 
     async def recv(self):
         """
@@ -379,6 +443,7 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
                     save_task = room._save_to_disc()
                     # task may be missing if save was already in progress
                     if save_task:
+                        # a document unchanged since its last save is saved as well
                         await save_task
                         await self.send(
                             self._encode_json_message({**save_reply, "status": "success"})
@@ -415,15 +480,23 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
         if self._room_id != "JupyterLab:globalAwareness":
             self._emit_awareness_event(self.current_user.username, "leave")
 
-    def _emit(self, level: LogLevel, action: str | None = None, msg: str | None = None) -> None:
+    def _emit(
+        self,
+        level: LogLevel,
+        action: str | None = None,
+        msg: str | None = None,
+        timings: dict[str, float] | None = None,
+    ) -> None:
         _, _, file_id = decode_file_path(self._room_id)
-        path = self._file_id_manager.get_path(file_id)
+        path = self._file_loaders.get_path(file_id)
 
-        data = {"level": level.value, "room": self._room_id, "path": path}
+        data: dict[str, Any] = {"level": level.value, "room": self._room_id, "path": path}
         if action:
             data["action"] = action
         if msg:
             data["msg"] = msg
+        if timings:
+            data["timings"] = dict(timings)
 
         self.event_logger.emit(schema_id=JUPYTER_COLLABORATION_EVENTS_URI, data=data)
 
@@ -454,21 +527,17 @@ class YDocWebSocketHandler(WebSocketHandler, JupyterHandler):
         await asyncio.sleep(self._cleanup_delay)
 
         async with self._room_lock(self._room_id):
-            # Remove the room from the websocket server
-            self.log.info("Deleting Y document from memory: %s", self._room_id)
-            await self._websocket_server.delete_room(room=self.room)
+            # Remove the room from the websocket server, and the file loader
+            # if there are no rooms using it
+            loader_deleted = await self._websocket_server.delete_document_room(
+                self._room_id, self.room, self._file_loaders
+            )
 
             # Clean room
             del self.room
             self.log.info("Room %s deleted", self._room_id)
             self._emit(LogLevel.INFO, "clean", "Room deleted.")
-
-            # Clean the file loader if there are not rooms using it
-            _, _, file_id = decode_file_path(self._room_id)
-            file = self._file_loaders[file_id]
-            if file.number_of_subscriptions == 0:
-                self.log.info("Deleting file %s", file.path)
-                await self._file_loaders.remove(file_id)
+            if loader_deleted:
                 self._emit(LogLevel.INFO, "clean", "Loader deleted.")
             del self._room_locks[self._room_id]
 
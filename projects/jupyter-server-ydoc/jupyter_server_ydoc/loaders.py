@@ -4,12 +4,24 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
+import os
 from collections.abc import Callable, Coroutine
+from datetime import datetime, timezone
 from http import HTTPStatus
 from logging import Logger, getLogger
-from time import time
-from typing import Any
+from pathlib import Path
+from time import monotonic, time
+from typing import Any, cast
 
+from jupyter_server.services.contents.filemanager import (
+    AsyncFileContentsManager,
+    FileContentsManager,
+)
+from jupyter_server.services.contents.largefilemanager import (
+    AsyncLargeFileManager,
+    LargeFileManager,
+)
 from jupyter_server.services.contents.manager import (
     AsyncContentsManager,
     ContentsManager,
@@ -18,7 +30,40 @@ from jupyter_server.utils import ensure_async
 from jupyter_server_fileid.manager import BaseFileIdManager
 from tornado.web import HTTPError
 
+from .schedulers import ThreadPoolScheduler
 from .utils import OutOfBandChanges
+from .watchers import BaseFileWatcher
+
+# Contents managers storing files on the local disk and hashing their bytes, for
+# which the hash of a saved file and the modification time of a file can be
+# computed without requesting them from the contents manager
+LOCAL_HASH_CONTENTS_MANAGERS = (
+    FileContentsManager,
+    AsyncFileContentsManager,
+    LargeFileManager,
+    AsyncLargeFileManager,
+)
+
+# Maximum size in bytes of the local files hashed to check whether their content changed
+# with their modification time, larger files are considered changed
+MAX_LOCAL_HASH_SIZE = 32 * 1024 * 1024
+
+
+def _hash_local_file(contents_manager: FileContentsManager, os_path: str) -> str | None:
+    """
+    Hashes a local file as its contents manager would, unless it is too large.
+
+        Parameters:
+            contents_manager (FileContentsManager): The contents manager of the file.
+            os_path (str): The path of the file on disk.
+
+        Returns:
+            hash (str | None): The hash of the file, or None above MAX_LOCAL_HASH_SIZE bytes.
+    """
+    with open(os_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size > MAX_LOCAL_HASH_SIZE:
+            return None
+        return contents_manager._get_hash(f.read())["hash"]
 
 
 class FileLoader:
@@ -35,22 +80,44 @@ class FileLoader:
         poll_interval: float | None = None,
         max_consecutive_logs: int = 3,
         stop_poll_on_errors_after: float | None = None,
+        path_cache_ttl: float | None = None,
+        thread_pool: ThreadPoolScheduler | None = None,
     ) -> None:
         self._file_id: str = file_id
 
-        self._lock = asyncio.Lock()
+        # Loads and saves are exclusive, polls don't wait for them and are fenced by
+        # the version of the state of the file, incremented by the loads and saves
+        self._write_lock = asyncio.Lock()
+        self._version = 0
+        self._polling = False
+        self.skipped_polls = 0
         self._poll_interval = poll_interval
         self._stop_poll_on_errors_after = stop_poll_on_errors_after
         self._file_id_manager = file_id_manager
         self._max_consecutive_logs = max_consecutive_logs
         self._contents_manager = contents_manager
+        # The thread pool running the calls of synchronous contents managers
+        self._thread_pool = thread_pool
+        # The path of the file, cached to not query the file ID manager on each access
+        self._path_cache_ttl = path_cache_ttl
+        self._cached_path: str | None = None
+        self._path_cached_at = 0.0
 
         self._log = log or getLogger(__name__)
+        self._consecutive_error_logs = 0
+        self._suppression_logged = False
+        self._consecutive_errors_started: float | None = None
+        # The number of consecutive polls without changes, to poll idle files less often
+        self.idle_polls = 0
         self._subscriptions: dict[str, Callable[[], Coroutine[Any, Any, None]]] = {}
         self._filepath_subscriptions: dict[str, Callable[[], Coroutine[Any, Any, None] | None]] = {}
 
         self._watcher = asyncio.create_task(self._watch_file()) if self._poll_interval else None
         self.last_modified = None
+        # The hash of the content last loaded or saved, to ignore the modifications
+        # of the file which don't change its content
+        self.last_hash: str | None = None
+        self.unchanged_modifications = 0
         self._current_path = self.path
 
     @property
@@ -62,12 +129,30 @@ class FileLoader:
     def path(self) -> str:
         """
         The file path.
+
+        With a path cache TTL, the path is cached for that duration, unless
+        the cache is invalidated.
         """
+        if (
+            self._cached_path is not None
+            and self._path_cache_ttl is not None
+            and monotonic() - self._path_cached_at < self._path_cache_ttl
+        ):
+            return self._cached_path
+
         path = self._file_id_manager.get_path(self.file_id)
         if path is None:
             raise RuntimeError(f"No path found for file ID '{self.file_id}'")
+        self._cached_path = path
+        self._path_cached_at = monotonic()
         return path
 
+    def invalidate_path(self) -> None:
+        """
+        Invalidates the cached path of the file, e.g. when files are moved.
+        """
+        self._cached_path = None
+
     @property
     def number_of_subscriptions(self) -> int:
         """
@@ -75,6 +160,13 @@ class FileLoader:
         """
         return len(self._subscriptions)
 
+    def mark_active(self) -> None:
+        """
+        Marks the file as active, e.g. when a client connects, so that it is polled
+        at the base poll interval again.
+        """
+        self.idle_polls = 0
+
     async def clean(self) -> None:
         """
         Clean up the file.
@@ -129,9 +221,14 @@ class FileLoader:
             Returns:
                 model (dict): A dictionary with the metadata and content of the file.
         """
-        async with self._lock:
-            model = await ensure_async(
-                self._contents_manager.get(self.path, format=format, type=file_type, content=True)
+        async with self._write_lock:
+            model = await self._call_contents_manager(
+                self._contents_manager.get,
+                self.path,
+                format=format,
+                type=file_type,
+                content=True,
+                require_hash=True,
             )
             if (
                 file_type == "file"
@@ -142,6 +239,8 @@ class FileLoader:
                 model["content"] = model["content"].replace("\r\n", "\n")
                 self._log.debug("Normalizing line endings for %s file on content load", self.path)
             self.last_modified = model["last_modified"]
+            self.last_hash = model.get("hash")
+            self._version += 1
             return model
 
     async def maybe_save_content(self, model: dict[str, Any]) -> dict[str, Any] | None:
@@ -158,23 +257,27 @@ class FileLoader:
         ### Note:
             If there is changes on disk, this method will raise an OutOfBandChanges exception.
         """
-        async with self._lock:
+        async with self._write_lock:
             path = self.path
             if model["type"] not in {"directory", "file", "notebook"}:
                 # fall back to file if unknown type, the content manager only knows
                 # how to handle these types
                 model["type"] = "file"
 
-            m = await ensure_async(
-                self._contents_manager.get(
-                    path, format=model["format"], type=model["type"], content=False
-                )
+            m = await self._call_contents_manager(
+                self._contents_manager.get,
+                path,
+                format=model["format"],
+                type=model["type"],
+                content=False,
             )
             # Skip saving if file is not writable
             if not m["writable"]:
                 return None
 
-            if self.last_modified == m["last_modified"]:
+            if self.last_modified == m["last_modified"] or not await self._has_content_changed(
+                path
+            ):
                 self._log.info("Saving file: %s", path)
                 # saving is shielded so that it cannot be cancelled
                 # otherwise it could corrupt the file
@@ -186,31 +289,129 @@ class FileLoader:
                 except asyncio.CancelledError:
                     pass
                 await done_saving.wait()
+                self.mark_active()
                 return saved_model
             else:
                 # file changed on disk, raise an error
                 self.last_modified = m["last_modified"]
+                self._version += 1
                 raise OutOfBandChanges
 
     async def _save_content(
         self, model: dict[str, Any], done_saving: asyncio.Event
     ) -> dict[str, Any]:
         try:
-            m = await ensure_async(self._contents_manager.save(model, self.path))
+            m = await self._call_contents_manager(self._contents_manager.save, model, self.path)
             self.last_modified = m["last_modified"]
-            # TODO, get rid of the extra `get` here once upstream issue:
-            # https://github.com/jupyter-server/jupyter_server/issues/1453 is resolved
-            model_with_hash = await ensure_async(
-                self._contents_manager.get(
+            if type(self._contents_manager) in LOCAL_HASH_CONTENTS_MANAGERS:
+                saved_hash = await self._get_saved_hash(model)
+            else:
+                # TODO, get rid of the extra `get` here once upstream issue:
+                # https://github.com/jupyter-server/jupyter_server/issues/1453 is resolved
+                model_with_hash = await self._call_contents_manager(
+                    self._contents_manager.get,
                     self.path,
                     content=False,
                     require_hash=True,
                 )
-            )
-            return {**m, "hash": model_with_hash["hash"]}
+                saved_hash = {"hash": model_with_hash["hash"]}
+            self.last_hash = saved_hash["hash"]
+            self._version += 1
+            return {**m, **saved_hash}
         finally:
             done_saving.set()
 
+    async def _call_contents_manager(
+        self, method: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """
+        Calls a method of the contents manager.
+
+        The methods of synchronous contents managers are run in the thread pool, if any,
+        so that their I/O doesn't block the event loop.
+
+            Parameters:
+                method (Callable): The method of the contents manager.
+                args: The positional arguments of the method.
+                kwargs: The keyword arguments of the method.
+
+            Returns:
+                result (Any): The result of the method.
+        """
+        if self._thread_pool is not None and not inspect.iscoroutinefunction(method):
+            return await self._thread_pool.run(method, *args, **kwargs)
+        return await ensure_async(method(*args, **kwargs))
+
+    async def _get_saved_hash(self, model: dict[str, Any]) -> dict[str, str]:
+        """
+        Computes the hash of a file saved by a contents manager storing files on disk,
+        as the contents manager would.
+
+        The bytes of a text file are the encoded content, unless the contents manager
+        has save hooks that may modify the file. Otherwise, the bytes are read back
+        from disk, as the contents manager serializes notebooks itself.
+
+            Parameters:
+                model (dict): The saved model, with its format, type and content.
+
+            Returns:
+                hash (dict): The hash and the hash algorithm of the file.
+        """
+        contents_manager = cast(FileContentsManager, self._contents_manager)
+        has_save_hooks = (
+            contents_manager.pre_save_hook is not None
+            or contents_manager.post_save_hook is not None
+            or contents_manager._pre_save_hooks
+            or contents_manager._post_save_hooks
+        )
+        if model["type"] == "file" and model["format"] == "text" and not has_save_hooks:
+            content = model["content"].encode("utf8")
+        else:
+            os_path = contents_manager._get_os_path(self.path)
+            content = await asyncio.to_thread(Path(os_path).read_bytes)
+        return contents_manager._get_hash(content)
+
+    async def _has_content_changed(self, path: str) -> bool:
+        """
+        Checks whether the content of a file whose modification time changed differs
+        from the content last loaded or saved, comparing their hashes.
+
+        The modification time of a file changes without its content e.g. when it is
+        touched, restored by a backup tool or checked out by git.
+
+        The files of a contents manager storing them on the local disk are read and hashed
+        in a thread, up to MAX_LOCAL_HASH_SIZE bytes to bound the memory of the check.
+        Larger files are considered changed, and reloaded when they are only touched.
+
+            Parameters:
+                path (str): The path of the file.
+
+            Returns:
+                changed (bool): False if the file has the content last loaded or saved.
+        """
+        if self.last_hash is None:
+            return True
+        if type(self._contents_manager) in LOCAL_HASH_CONTENTS_MANAGERS:
+            contents_manager = cast(FileContentsManager, self._contents_manager)
+            try:
+                file_hash = await asyncio.to_thread(
+                    _hash_local_file, contents_manager, contents_manager._get_os_path(path)
+                )
+            except OSError:
+                return True
+            if file_hash is None:
+                return True
+        else:
+            model = await self._call_contents_manager(
+                self._contents_manager.get, path, content=False, require_hash=True
+            )
+            file_hash = model.get("hash")
+        if file_hash != self.last_hash:
+            return True
+        self._log.debug("The modification time of %s changed, but not its content", path)
+        self.unchanged_modifications += 1
+        return False
+
     async def _watch_file(self) -> None:
         """
         Async task for watching a file.
@@ -220,77 +421,113 @@ class FileLoader:
         if self._poll_interval is None:
             return
 
-        consecutive_error_logs = 0
-        suppression_logged = False
-        consecutive_errors_started = None
-
         while True:
             try:
                 await asyncio.sleep(self._poll_interval)
-                try:
-                    await self.maybe_notify()
-                    consecutive_error_logs = 0
-                    suppression_logged = False
-                    consecutive_errors_started = None
-                except Exception as e:
-                    # We do not want to terminate the watcher if the content manager request
-                    # fails due to timeout, server error or similar temporary issue; we only
-                    # terminate if the file is not found or we get unauthorized error for
-                    # an extended period of time.
-                    if isinstance(e, HTTPError) and e.status_code in {
-                        HTTPStatus.NOT_FOUND,
-                        HTTPStatus.UNAUTHORIZED,
-                    }:
-                        if (
-                            consecutive_errors_started
-                            and self._stop_poll_on_errors_after is not None
-                        ):
-                            errors_duration = time() - consecutive_errors_started
-                            if errors_duration > self._stop_poll_on_errors_after:
-                                self._log.warning(
-                                    (
-                                        "Stopping watching file due to consecutive "
-                                        "errors over %s seconds: %s"
-                                    ),
-                                    self._stop_poll_on_errors_after,
-                                    self.path,
-                                )
-                                break
-                        else:
-                            consecutive_errors_started = time()
-                    # Otherwise we just log the error
-                    if consecutive_error_logs < self._max_consecutive_logs:
-                        self._log.error("Error watching file %s: %s", self.path, e, exc_info=e)
-                        consecutive_error_logs += 1
-                    elif not suppression_logged:
+                if not await self.poll():
+                    break
+            except asyncio.CancelledError:
+                break
+
+    async def poll(self) -> bool:
+        """
+        Checks the file for out-of-band changes and notifies the subscribed rooms.
+
+        Errors are logged, as the contents manager may fail temporarily.
+
+            Returns:
+                watching (bool): False if the file shouldn't be watched anymore, because
+                    it was not found or unauthorized for an extended period of time.
+        """
+        try:
+            await self.maybe_notify()
+        except Exception as e:
+            # We do not want to terminate the watcher if the content manager request
+            # fails due to timeout, server error or similar temporary issue; we only
+            # terminate if the file is not found or we get unauthorized error for
+            # an extended period of time.
+            if isinstance(e, HTTPError) and e.status_code in {
+                HTTPStatus.NOT_FOUND,
+                HTTPStatus.UNAUTHORIZED,
+            }:
+                if self._consecutive_errors_started and self._stop_poll_on_errors_after is not None:
+                    errors_duration = time() - self._consecutive_errors_started
+                    if errors_duration > self._stop_poll_on_errors_after:
                         self._log.warning(
-                            "Too many errors while watching %s - suppressing further logs.",
+                            "Stopping watching file due to consecutive errors over %s seconds: %s",
+                            self._stop_poll_on_errors_after,
                             self.path,
                         )
-                        suppression_logged = True
-
-            except asyncio.CancelledError:
-                break
+                        return False
+                else:
+                    self._consecutive_errors_started = time()
+            # Otherwise we just log the error
+            if self._consecutive_error_logs < self._max_consecutive_logs:
+                self._log.error("Error watching file %s: %s", self.path, e, exc_info=e)
+                self._consecutive_error_logs += 1
+            elif not self._suppression_logged:
+                self._log.warning(
+                    "Too many errors while watching %s - suppressing further logs.",
+                    self.path,
+                )
+                self._suppression_logged = True
+        else:
+            self._consecutive_error_logs = 0
+            self._suppression_logged = False
+            self._consecutive_errors_started = None
+        return True
 
     async def maybe_notify(self) -> None:
         """
         Notifies subscribed rooms about out-of-band file changes.
+
+        The check is skipped while the file is loaded or saved, or already checked,
+        as the state of the file is being updated. Its result is discarded if the file
+        was loaded or saved during the check.
         """
+        if self._polling or self._write_lock.locked():
+            self.skipped_polls += 1
+            return
+
         do_notify = False
         filepath_change = False
-        async with self._lock:
+        version = self._version
+        self._polling = True
+        try:
             path = self.path
+            try:
+                # Get model metadata; format and type are not need
+                model = await self._call_contents_manager(
+                    self._contents_manager.get, path, content=False
+                )
+            except HTTPError as e:
+                # the file may have been moved since its path was cached
+                self.invalidate_path()
+                if e.status_code != HTTPStatus.NOT_FOUND or self.path == path:
+                    raise
+                path = self.path
+                model = await self._call_contents_manager(
+                    self._contents_manager.get, path, content=False
+                )
+
+            if self.last_modified is not None and self.last_modified < model["last_modified"]:
+                do_notify = await self._has_content_changed(path)
+
+            if self._version != version or self._write_lock.locked():
+                # the model may be older than the state of the file
+                self.skipped_polls += 1
+                return
+
             if self._current_path != path:
                 self._current_path = path
                 filepath_change = True
 
-            # Get model metadata; format and type are not need
-            model = await ensure_async(self._contents_manager.get(path, content=False))
-
-            if self.last_modified is not None and self.last_modified < model["last_modified"]:
-                do_notify = True
-
             self.last_modified = model["last_modified"]
+        finally:
+            self._polling = False
+
+        if filepath_change or do_notify:
+            self.mark_active()
 
         if filepath_change:
             # Notify filepath change
@@ -299,13 +536,30 @@ class FileLoader:
 
         if do_notify:
             # Notify out-of-band change
-            # callbacks will load the file content, thus release the lock before calling them
+            # callbacks will load the file content, so they are called after the check
             for callback in self._subscriptions.values():
                 await callback()
 
 
 class FileLoaderMapping:
-    """Map rooms to file loaders."""
+    """
+    Map rooms to file loaders.
+
+    The files of the loaders are watched by a single poller, which checks them
+    all at each poll interval. With a contents manager storing files on the local
+    disk, the modification times are read from the file system, and only the files
+    whose modification time changed are checked with the contents manager.
+
+    With a maximum poll interval, the poll interval of a file doubles after each
+    check without changes, up to the maximum. It is reset when the file is marked
+    as active, i.e. when it changes, is saved, or a client connects to its room.
+
+    With a file watcher class and a contents manager storing files on the local disk,
+    the files are checked when the file watcher notifies their changes instead.
+
+    With a number of contents manager threads, the calls of the loaders to a
+    synchronous contents manager run in a thread pool shared by the loaders.
+    """
 
     def __init__(
         self,
@@ -313,6 +567,10 @@ class FileLoaderMapping:
         log: Logger | None = None,
         file_poll_interval: float | None = None,
         file_stop_poll_on_errors_after: float | None = None,
+        file_watcher_class: type[BaseFileWatcher] | None = None,
+        file_poll_max_interval: float | None = None,
+        file_path_cache_ttl: float | None = None,
+        contents_manager_threads: int | None = None,
     ) -> None:
         """
         Args:
@@ -320,12 +578,44 @@ class FileLoaderMapping:
             log: [optional] Server log; default to local logger
             file_poll_interval: [optional] Interval between room
                 notification; default the loader won't poll
+            file_watcher_class: [optional] Class of the file watcher notifying the
+                changes of local files; default the files are polled
+            file_poll_max_interval: [optional] Maximum interval between the checks
+                of idle files; default the files are checked at each poll interval
+            file_path_cache_ttl: [optional] Duration in seconds to cache the paths of
+                the files; default the paths are not cached
+            contents_manager_threads: [optional] Number of threads running the calls of
+                a synchronous contents manager, which must be thread-safe; default the
+                calls run on the event loop
         """
         self._settings = settings
         self.__dict: dict[str, FileLoader] = {}
         self.log = log or getLogger(__name__)
         self.file_poll_interval = file_poll_interval
         self._stop_poll_on_errors_after = file_stop_poll_on_errors_after
+        # The loaders watched by the poller
+        self._polled: dict[str, FileLoader] = {}
+        self._poller: asyncio.Task | None = None
+        self.file_poll_max_interval = file_poll_max_interval
+        self._file_path_cache_ttl = file_path_cache_ttl
+        # The time of the last check of the polled files, by file ID
+        self._last_polls: dict[str, float] = {}
+        # The paths on disk of the files watched by the file watcher, by file ID
+        self._file_watcher_class = file_watcher_class
+        self._file_watcher: BaseFileWatcher | None = None
+        self._watched: dict[str, str] = {}
+        self._background_tasks: set[asyncio.Task] = set()
+        self.thread_pool = (
+            ThreadPoolScheduler(contents_manager_threads, thread_name_prefix="contents-manager")
+            if contents_manager_threads
+            else None
+        )
+
+        self.poll_cycles = 0
+        self.checked_files = 0
+        self.total_poll_duration = 0.0
+        self.last_poll_duration = 0.0
+        self.max_poll_duration = 0.0
 
     @property
     def contents_manager(self) -> AsyncContentsManager | ContentsManager:
@@ -335,6 +625,24 @@ class FileLoaderMapping:
     def file_id_manager(self) -> BaseFileIdManager:
         return self._settings["file_id_manager"]
 
+    @property
+    def metrics(self) -> dict[str, Any]:
+        """
+        The metrics of the file watching. A poll cycle checks the files at each poll
+        interval, or when the file watcher notifies changes.
+        """
+        return {
+            "watched_files": len(self._watched),
+            "polled_files": len(self._polled),
+            "poll_cycles": self.poll_cycles,
+            "checked_files": self.checked_files,
+            "average_poll_duration": (
+                self.total_poll_duration / self.poll_cycles if self.poll_cycles else 0.0
+            ),
+            "last_poll_duration": self.last_poll_duration,
+            "max_poll_duration": self.max_poll_duration,
+        }
+
     def __contains__(self, file_id: str) -> bool:
         """Test if a file has a loader."""
         return file_id in self.__dict
@@ -350,18 +658,47 @@ class FileLoaderMapping:
         file = self.__dict.get(file_id)
         if file is None:
             self.log.info("Creating FileLoader for: %s", path)
+            # the file is watched by the mapping
             file = FileLoader(
                 file_id,
                 self.file_id_manager,
                 self.contents_manager,
                 self.log,
-                self.file_poll_interval,
                 stop_poll_on_errors_after=self._stop_poll_on_errors_after,
+                path_cache_ttl=self._file_path_cache_ttl,
+                thread_pool=self.thread_pool,
             )
             self.__dict[file_id] = file
+            if not self._watch(file):
+                self._poll(file)
 
         return file
 
+    def get_path(self, file_id: str) -> str | None:
+        """
+        Returns the path of a file, as cached by its loader if it has one.
+
+            Parameters:
+                file_id (str): The file ID.
+
+            Returns:
+                path (str | None): The file path, or None if the file ID is unknown.
+        """
+        loader = self.__dict.get(file_id)
+        if loader is None:
+            return self.file_id_manager.get_path(file_id)
+        try:
+            return loader.path
+        except RuntimeError:
+            return None
+
+    def invalidate_paths(self) -> None:
+        """
+        Invalidates the cached paths of all the loaders, e.g. when files are moved.
+        """
+        for loader in self.__dict.values():
+            loader.invalidate_path()
+
     async def __delitem__(self, file_id: str) -> None:
         """Delete a loader for a given file."""
         await self.remove(file_id)
@@ -372,10 +709,230 @@ class FileLoaderMapping:
         for id in list(self.__dict):
             loader = self.__dict.pop(id)
             tasks.append(loader.clean())
-
-        await asyncio.gather(*tasks)
+        self._polled.clear()
+        self._last_polls.clear()
+        self._watched.clear()
+        for task in self._background_tasks:
+            task.cancel()
+        tasks.extend(self._background_tasks)
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._stop_polling()
+        if self._file_watcher is not None:
+            await self._file_watcher.stop()
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown()
 
     async def remove(self, file_id: str) -> None:
         """Remove the loader for a given file."""
         loader = self.__dict.pop(file_id)
+        self._polled.pop(file_id, None)
+        self._last_polls.pop(file_id, None)
+        self._unwatch(file_id)
         await loader.clean()
+        if not self._polled:
+            await self._stop_polling()
+
+    def _watch(self, loader: FileLoader) -> bool:
+        """
+        Watches the file of a loader with the file watcher.
+
+            Returns:
+                watched (bool): Whether the file is watched, otherwise it should be polled.
+        """
+        if (
+            self._file_watcher_class is None
+            or type(self.contents_manager) not in LOCAL_HASH_CONTENTS_MANAGERS
+        ):
+            return False
+
+        os_path = self._get_os_path(loader)
+        if os_path is None:
+            return False
+
+        if self._file_watcher is None:
+            self._file_watcher = self._file_watcher_class(
+                self._on_files_changed, log=self.log, error_callback=self._on_file_watcher_error
+            )
+        self._file_watcher.watch(os_path)
+        self._watched[loader.file_id] = os_path
+        return True
+
+    def _get_os_path(self, loader: FileLoader) -> str | None:
+        contents_manager = cast(FileContentsManager, self.contents_manager)
+        try:
+            return contents_manager._get_os_path(loader.path)
+        except (RuntimeError, HTTPError):
+            return None
+
+    def _unwatch(self, file_id: str) -> None:
+        os_path = self._watched.pop(file_id, None)
+        if os_path is not None and os_path not in self._watched.values():
+            assert self._file_watcher is not None
+            self._file_watcher.unwatch(os_path)
+
+    def _on_files_changed(self, os_paths: set[str]) -> None:
+        """
+        Checks the files notified by the file watcher.
+
+            Parameters:
+                os_paths (set[str]): The paths on disk of the changed files.
+        """
+        loaders = [
+            self.__dict[file_id]
+            for file_id, os_path in self._watched.items()
+            if os_path in os_paths
+        ]
+        if loaders:
+            task = asyncio.create_task(self._check_watched_files(loaders))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    def _on_file_watcher_error(self, error: Exception) -> None:
+        """
+        Polls the files of a failed file watcher instead, and the files opened afterwards.
+
+            Parameters:
+                error (Exception): The error of the file watcher.
+        """
+        self.log.warning("File watcher failed, polling the watched files instead: %s", error)
+        # the failed watcher stopped watching the files
+        self._file_watcher_class = None
+        self._file_watcher = None
+        watched, self._watched = self._watched, {}
+        for file_id in watched:
+            self._poll(self.__dict[file_id])
+
+    async def _check_watched_files(self, loaders: list[FileLoader]) -> None:
+        start = monotonic()
+        loaders = await self._get_changed_loaders(loaders)
+        results = await asyncio.gather(*(loader.poll() for loader in loaders))
+        for loader, watching in zip(loaders, results):
+            os_path = self._watched.get(loader.file_id)
+            if os_path is None:
+                # the loader was removed while checking it
+                continue
+            if not watching:
+                self._unwatch(loader.file_id)
+            elif self._get_os_path(loader) != os_path:
+                # watch the new path of a moved file
+                self._unwatch(loader.file_id)
+                if not self._watch(loader):
+                    self._poll(loader)
+
+        self.poll_cycles += 1
+        self.checked_files += len(loaders)
+        self.last_poll_duration = monotonic() - start
+        self.total_poll_duration += self.last_poll_duration
+        self.max_poll_duration = max(self.max_poll_duration, self.last_poll_duration)
+
+    def _poll(self, loader: FileLoader) -> None:
+        """
+        Watches the file of a loader with the poller.
+        """
+        if not self.file_poll_interval:
+            return
+        self._polled[loader.file_id] = loader
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_files())
+
+    async def _stop_polling(self) -> None:
+        if self._poller is None:
+            return
+        poller, self._poller = self._poller, None
+        poller.cancel()
+        try:
+            await poller
+        except asyncio.CancelledError:
+            pass
+
+    async def _poll_files(self) -> None:
+        """
+        Async task for watching the files of the loaders.
+        """
+        assert self.file_poll_interval is not None
+        while True:
+            await asyncio.sleep(self.file_poll_interval)
+            start = monotonic()
+
+            loaders = [
+                loader for loader in self._polled.values() if self._is_poll_due(loader, start)
+            ]
+            for loader in loaders:
+                self._last_polls[loader.file_id] = start
+                # reset when the file is marked as active
+                loader.idle_polls += 1
+
+            loaders = await self._get_changed_loaders(loaders)
+            results = await asyncio.gather(*(loader.poll() for loader in loaders))
+            for loader, watching in zip(loaders, results):
+                if not watching:
+                    self._polled.pop(loader.file_id, None)
+
+            self.poll_cycles += 1
+            self.checked_files += len(loaders)
+            self.last_poll_duration = monotonic() - start
+            self.total_poll_duration += self.last_poll_duration
+            self.max_poll_duration = max(self.max_poll_duration, self.last_poll_duration)
+
+    def _is_poll_due(self, loader: FileLoader, now: float) -> bool:
+        """
+        Whether the file of a loader should be checked in the current poll cycle.
+
+        The interval between the checks of a file doubles with each check without
+        changes, up to the maximum poll interval.
+        """
+        assert self.file_poll_interval is not None
+        last_poll = self._last_polls.get(loader.file_id)
+        if last_poll is None or self.file_poll_max_interval is None:
+            return True
+        # cap the exponent, so that the interval doesn't overflow
+        idle_polls = min(loader.idle_polls, 64)
+        poll_interval = min(self.file_poll_interval * 2**idle_polls, self.file_poll_max_interval)
+        # tolerate the jitter of the poll cycles
+        return now - last_poll >= poll_interval - self.file_poll_interval / 2
+
+    async def _get_changed_loaders(self, loaders: list[FileLoader]) -> list[FileLoader]:
+        """
+        Returns the loaders whose file may have changed, to check with the contents manager.
+
+        With a contents manager storing files on the local disk, the files are stat'ed
+        in a worker thread; the loaders whose file has the same path and modification
+        time as when it was last checked are skipped. Otherwise, all the loaders are
+        returned.
+        """
+        if type(self.contents_manager) not in LOCAL_HASH_CONTENTS_MANAGERS:
+            return loaders
+
+        contents_manager = cast(FileContentsManager, self.contents_manager)
+        changed = []
+        candidates = []
+        for loader in loaders:
+            try:
+                path = loader.path
+                os_path = contents_manager._get_os_path(path)
+            except (RuntimeError, HTTPError):
+                # let the contents manager report the error
+                changed.append(loader)
+                continue
+            if loader.last_modified is None or path != loader._current_path:
+                changed.append(loader)
+            else:
+                candidates.append((loader, os_path))
+
+        def get_modification_times() -> list[datetime | None]:
+            last_modified: list[datetime | None] = []
+            for _, os_path in candidates:
+                try:
+                    mtime = os.lstat(os_path).st_mtime
+                    last_modified.append(datetime.fromtimestamp(mtime, timezone.utc))
+                except (ValueError, OverflowError, OSError):
+                    last_modified.append(None)
+            return last_modified
+
+        if candidates:
+            modification_times = await asyncio.to_thread(get_modification_times)
+            for (loader, _), last_modified in zip(candidates, modification_times):
+                if last_modified is None or last_modified != loader.last_modified:
+                    changed.append(loader)
+        return changed
@@ -14,8 +14,10 @@ from jupyter_ydoc import YNotebook, YUnicode
 from pycrdt import Provider
 from pycrdt.websocket.websocket import HttpxWebsocket
 
+from jupyter_server_ydoc.caches import SourceUpdateCache
 from jupyter_server_ydoc.loaders import FileLoader
 from jupyter_server_ydoc.rooms import DocumentRoom
+from jupyter_server_ydoc.schedulers import SaveScheduler
 from jupyter_server_ydoc.stores import SQLiteYStore
 
 from .test_utils import (
@@ -288,6 +290,14 @@ def rtc_create_mock_document_room():
         save_delay: float | None = None,
         store: SQLiteYStore | None = None,
         writable: bool = True,
+        source_update_cache: SourceUpdateCache | None = None,
+        document_build_offload_threshold_mb: float | None = None,
+        document_save_offload_threshold_mb: float | None = None,
+        save_max_wait: float | None = None,
+        save_min_interval: float | None = None,
+        save_cost_factor: float = 0,
+        save_delay_per_mb: float = 0,
+        save_scheduler: SaveScheduler | None = None,
     ) -> tuple[FakeContentsManager, FileLoader, DocumentRoom]:
         paths = {id: path}
 
@@ -318,6 +328,14 @@ def rtc_create_mock_document_room():
                 None,
                 save_delay,
                 document_load_progressively=False,
+                source_update_cache=source_update_cache,
+                document_build_offload_threshold_mb=document_build_offload_threshold_mb,
+                document_save_offload_threshold_mb=document_save_offload_threshold_mb,
+                save_max_wait=save_max_wait,
+                save_min_interval=save_min_interval,
+                save_cost_factor=save_cost_factor,
+                save_delay_per_mb=save_delay_per_mb,
+                save_scheduler=save_scheduler,
             ),
         )
 
@@ -7,24 +7,92 @@ import asyncio
 import json
 from collections.abc import Callable
 from logging import Logger
+from time import monotonic
 from typing import Any
 
 from jupyter_events import EventLogger
+from jupyter_ydoc import YNotebook
 from jupyter_ydoc import ydocs as YDOCS
 from pycrdt import (
     Channel,
     Doc,
     Encoder,
+    Text,
 )
 from pycrdt.store import BaseYStore, YDocNotFound
 from pycrdt.websocket import YRoom
 
+from .caches import SourceUpdateCache
 from .loaders import FileLoader
-from .utils import JUPYTER_COLLABORATION_EVENTS_URI, LogLevel, MessageType, OutOfBandChanges
+from .schedulers import SaveScheduler
+from .stores import SQLiteYStore
+from .utils import (
+    JUPYTER_COLLABORATION_EVENTS_URI,
+    LogLevel,
+    MessageType,
+    OutOfBandChanges,
+    apply_text_diff,
+    encode_document_snapshot,
+    record_duration,
+)
 
 YFILE = YDOCS["file"]
 
 
+async def abuild_source_update(file_type: str, content: Any) -> bytes:
+    """
+    Builds the deterministic update of a source content.
+
+        Parameters:
+            file_type (str): Content type.
+            content (Any): The source content.
+
+        Returns:
+            update (bytes): The Y update of a document holding the content.
+    """
+    source_ydoc: Doc = Doc(client_id=0)
+    await YDOCS.get(file_type, YFILE)(source_ydoc).aset(content)
+    return source_ydoc.get_update()
+
+
+def build_source_update(file_type: str, content: Any) -> bytes:
+    """
+    Builds the deterministic update of a source content in a worker thread.
+
+    It runs `abuild_source_update` in an event loop of the calling thread, so that
+    the update is the same as the one built on the main event loop, and only uses
+    objects created in the calling thread.
+
+        Parameters:
+            file_type (str): Content type.
+            content (Any): The source content.
+
+        Returns:
+            update (bytes): The Y update of a document holding the content.
+    """
+    return asyncio.run(abuild_source_update(file_type, content))
+
+
+def read_document_content(file_type: str, update: bytes) -> Any:
+    """
+    Reads the content of a document from its update.
+
+    It only uses objects created in the calling thread, so that it can run
+    in a worker thread.
+
+        Parameters:
+            file_type (str): Content type.
+            update (bytes): The Y update of the document.
+
+        Returns:
+            content (Any): The content of the document.
+    """
+    ydoc: Doc = Doc()
+    document = YDOCS.get(file_type, YFILE)(ydoc)
+    ydoc.apply_update(update)
+    return document.get()
+
+
 class DocumentRoom(YRoom):
     """A Y room for a possibly stored document (e.g. a notebook)."""
 
@@ -43,6 +111,14 @@ class DocumentRoom(YRoom):
         document_load_progressively: bool = False,
         notebook_output_delay_threshold_mb: float | None = 100,
         exception_handler: Callable[[Exception, Logger], bool] | None = None,
+        source_update_cache: SourceUpdateCache | None = None,
+        document_build_offload_threshold_mb: float | None = None,
+        document_save_offload_threshold_mb: float | None = None,
+        save_max_wait: float | None = None,
+        save_min_interval: float | None = None,
+        save_cost_factor: float = 0,
+        save_delay_per_mb: float = 0,
+        save_scheduler: SaveScheduler | None = None,
     ):
         super().__init__(ready=False, ystore=ystore, exception_handler=exception_handler, log=log)
 
@@ -51,12 +127,19 @@ class DocumentRoom(YRoom):
         self._file_type: str = file_type
         self._file: FileLoader = file
         self._document = YDOCS.get(self._file_type, YFILE)(self.ydoc, self.awareness)
-        self._document.path = self._file.path
 
         self._logger = logger
         self._save_delay = save_delay
         self._document_load_progressively = document_load_progressively
         self._notebook_output_delay_threshold_mb = notebook_output_delay_threshold_mb
+        self._source_update_cache = source_update_cache
+        self._document_build_offload_threshold_mb = document_build_offload_threshold_mb
+        self._document_save_offload_threshold_mb = document_save_offload_threshold_mb
+        self._save_max_wait = save_max_wait
+        self._save_min_interval = save_min_interval
+        self._save_cost_factor = save_cost_factor
+        self._save_delay_per_mb = save_delay_per_mb
+        self._save_scheduler = save_scheduler
         if (
             document_load_progressively
             and notebook_output_delay_threshold_mb is not None
@@ -67,12 +150,31 @@ class DocumentRoom(YRoom):
         self._update_lock = asyncio.Lock()
         self._cleaner: asyncio.Task | None = None
         self._saving_document: asyncio.Task | None = None
+        # Whether the saving task waits for a save in flight to finish before starting
+        self._save_queued = False
+        self._save_timer: asyncio.TimerHandle | None = None
+        self._save_deadline: float | None = None
         self._messages: dict[str, asyncio.Lock] = {}
         self._background_tasks = set()
         self._document_progressively_loaded: asyncio.Future[None] = asyncio.Future()
+        self._timings: dict[str, float] = {}
+        self._initialize_start = 0.0
+        # Autosave state, used to adapt the save delay
+        self._first_unsaved_change: float | None = None
+        self._last_save_end: float | None = None
+        self._last_save_duration = 0.0
+        self._last_save_size = 0
+        # The snapshot of the document as of its last save, to skip saving it again
+        self._saved_snapshot: bytes | None = None
+
+        # The autosave setting of the clients, collected on first use and then
+        # kept up to date with the awareness changes
+        self._autosave_clients: dict[int, bool] | None = None
+        self._autosave_enabled_clients = 0
 
         # Listen for document changes
         self._document.observe(self._on_document_change)
+        self._awareness_subscription = self.awareness.observe(self._on_awareness_change)
         self._file.observe(self.room_id, self._on_outofband_change, self._on_filepath_change)
 
         self.on_message_error = self._handle_sync_message_error
@@ -94,6 +196,13 @@ class DocumentRoom(YRoom):
         """
         return self._room_id
 
+    @property
+    def timings(self) -> dict[str, float]:
+        """
+        The durations in seconds of the phases of the room initialization.
+        """
+        return self._timings
+
     @property
     def cleaner(self) -> asyncio.Task | None:
         """
@@ -119,6 +228,14 @@ class DocumentRoom(YRoom):
         case, we load the Y updates from the store. Otherwise, we load the content
         from disk.
 
+        The content is loaded from disk while the Y updates are applied from the
+        store, as both are independent I/O bound operations. The store may keep a
+        fingerprint of the content it is in sync with, in which case the document
+        is only compared with the content on disk if the fingerprint doesn't match.
+
+        The duration of each phase of the initialization is recorded in `timings`
+        and emitted with the "Room initialized" event.
+
         ### Note:
             It is important to set the ready property in the parent class (`self.ready = True`),
             this setter will subscribe for updates on the shared document.
@@ -128,41 +245,26 @@ class DocumentRoom(YRoom):
 
         self.log.info("Initializing room %s", self._room_id)
 
-        model = await self._file.load_content(self._file_format, self._file_type)
-
+        self._timings = {}
+        self._initialize_start = monotonic()
         await self._update_lock.acquire()
         release_update_lock = True
         try:
-            # try to apply Y updates from the YStore for this document
-            read_from_source = True
-            loaded_from_store = False
-            if self.ystore is not None:
-                async with self.ystore.start_lock:
-                    if not self.ystore.started.is_set():
-                        self.create_task(self.ystore.start())
-                        await self.ystore.started.wait()
-                try:
-                    await self.ystore.apply_updates(self.ydoc)
-                    self._emit(
-                        LogLevel.INFO,
-                        "load",
-                        f"Content loaded from the store {self.ystore.__class__.__qualname__}",
-                    )
-                    self.log.info(
-                        "Content in room %s loaded from the ystore %s",
-                        self._room_id,
-                        self.ystore.__class__.__name__,
-                    )
-                    read_from_source = False
-                    loaded_from_store = True
-                except YDocNotFound:
-                    # YDoc not found in the YStore, create the document from
-                    # the source file (no change history)
-                    pass
-
+            load_content = asyncio.create_task(self._load_content())
+            try:
+                # try to apply Y updates from the YStore for this document
+                loaded_from_store = await self._apply_updates_from_store()
+            except BaseException:
+                load_content.cancel()
+                raise
+            model = await load_content
+
+            read_from_source = not loaded_from_store
             if not read_from_source:
                 # if YStore updates and source file are out-of-sync, resync updates with source
-                if await self._document.aget() != model["content"]:
+                with record_duration(self._timings, "sync_check"):
+                    in_sync = await self._is_in_sync_with_store(model)
+                if not in_sync:
                     # TODO: Delete document from the store.
                     self._emit(
                         LogLevel.INFO,
@@ -176,6 +278,11 @@ class DocumentRoom(YRoom):
                     )
                     read_from_source = True
 
+            # The path is set once the document is compared with its fingerprint, and only
+            # if it changed, as it modifies the document
+            if self._document.path != self._file.path:
+                await self._set_path(store=not read_from_source)
+
             if read_from_source:
                 self._emit(LogLevel.INFO, "load", "Content loaded from disk.")
                 self.log.info(
@@ -194,6 +301,9 @@ class DocumentRoom(YRoom):
                             )
                         )
                         await initialized.wait()
+                        self._timings["progressive_initialized"] = (
+                            monotonic() - self._initialize_start
+                        )
                         if (
                             self._document_progressively_loaded.done()
                             and (exc := self._document_progressively_loaded.exception()) is not None
@@ -202,22 +312,136 @@ class DocumentRoom(YRoom):
                         self.ready = True
                         await self.ydoc_observed.wait()
                         finish.set()
-                        self._emit(LogLevel.INFO, "initialize", "Room initialized")
+                        self._timings["total"] = monotonic() - self._initialize_start
+                        self._emit(
+                            LogLevel.INFO, "initialize", "Room initialized", timings=self._timings
+                        )
                         return
                     else:
-                        await self._apply_deterministic_source_content(model["content"])
+                        with record_duration(self._timings, "source_build"):
+                            await self._apply_deterministic_source_content(
+                                model["content"],
+                                cache_key=self._get_source_update_cache_key(model),
+                                size=model.get("size"),
+                            )
                 else:
-                    await self._document.aset(model["content"])
+                    with record_duration(self._timings, "source_build"):
+                        await self._document.aset(model["content"])
 
                 if self.ystore:
-                    await self.ystore.encode_state_as_update(self.ydoc)
+                    with record_duration(self._timings, "ystore_write"):
+                        await self.ystore.encode_state_as_update(self.ydoc)
+                        await self._set_fingerprint(
+                            model.get("hash"), encode_document_snapshot(self.ydoc)
+                        )
 
             self.ready = True
-            self._emit(LogLevel.INFO, "initialize", "Room initialized")
+            self._timings["total"] = monotonic() - self._initialize_start
+            self._emit(LogLevel.INFO, "initialize", "Room initialized", timings=self._timings)
         finally:
             if release_update_lock:
                 self._update_lock.release()
 
+    async def _set_path(self, store: bool) -> None:
+        """
+        Sets the path of the document before the room is ready.
+
+        The changes made before the room is ready are not written to the store by
+        the room, as the content read from disk is written at once.
+
+            Parameters:
+                store (bool): Whether to write the change to the store, so that the
+                    stored updates keep matching the fingerprints of the next saves.
+        """
+        if not store or self.ystore is None:
+            self._document.path = self._file.path
+            return
+
+        updates: list[bytes] = []
+        subscription = self.ydoc.observe(lambda event: updates.append(event.update))
+        try:
+            self._document.path = self._file.path
+        finally:
+            self.ydoc.unobserve(subscription)
+        for update in updates:
+            await self.ystore.write(update)
+
+    async def _load_content(self) -> dict[str, Any]:
+        """
+        Loads the content of the file, recording the duration of the contents manager call.
+        """
+        with record_duration(self._timings, "contents_get"):
+            return await self._file.load_content(self._file_format, self._file_type)
+
+    async def _apply_updates_from_store(self) -> bool:
+        """
+        Applies the Y updates from the store to the shared document.
+
+            Returns:
+                loaded (bool): Whether the document was found in the store.
+        """
+        if self.ystore is None:
+            return False
+
+        with record_duration(self._timings, "ystore_start"):
+            async with self.ystore.start_lock:
+                if not self.ystore.started.is_set():
+                    self.create_task(self.ystore.start())
+                    await self.ystore.started.wait()
+        try:
+            with record_duration(self._timings, "ystore_apply_updates"):
+                await self.ystore.apply_updates(self.ydoc)
+        except YDocNotFound:
+            # YDoc not found in the YStore, create the document from
+            # the source file (no change history)
+            return False
+
+        self._emit(
+            LogLevel.INFO,
+            "load",
+            f"Content loaded from the store {self.ystore.__class__.__qualname__}",
+        )
+        self.log.info(
+            "Content in room %s loaded from the ystore %s",
+            self._room_id,
+            self.ystore.__class__.__name__,
+        )
+        return True
+
+    async def _is_in_sync_with_store(self, model: dict[str, Any]) -> bool:
+        """
+        Checks whether the document loaded from the store matches the content on disk.
+
+        The fingerprint stored with the Y updates is checked first. The document
+        is only materialized and compared with the content when the fingerprint
+        is missing or doesn't match.
+
+            Parameters:
+                model (dict): The file model, with its content and hash.
+
+            Returns:
+                in_sync (bool): Whether the document matches the content.
+        """
+        if isinstance(self.ystore, SQLiteYStore) and model.get("hash") is not None:
+            fingerprint = await self.ystore.get_fingerprint()
+            if fingerprint == (model["hash"], encode_document_snapshot(self.ydoc)):
+                return True
+
+        return await self._document.aget() == model["content"]
+
+    async def _set_fingerprint(self, hash: str | None, snapshot: bytes) -> None:
+        """
+        Stores the fingerprint of the content on disk with the Y updates.
+
+            Parameters:
+                hash (str | None): The hash of the content on disk.
+                snapshot (bytes): The snapshot of the document matching the content.
+        """
+        if hash is None or not isinstance(self.ystore, SQLiteYStore):
+            return
+
+        await self.ystore.set_fingerprint(hash, snapshot)
+
     async def _finish_progressive_initialization(
         self, content: Any, initialized: asyncio.Event, finish: asyncio.Event
     ) -> None:
@@ -234,11 +458,16 @@ class DocumentRoom(YRoom):
             self._document_progressively_loaded.set_exception(e)
         else:
             self._document_progressively_loaded.set_result(None)
+            self._timings["progressive_loaded"] = monotonic() - self._initialize_start
+            self._emit(
+                LogLevel.INFO,
+                "load",
+                "Content progressively loaded.",
+                timings={"progressive_loaded": self._timings["progressive_loaded"]},
+            )
             if await self._document.aget() != content:
                 # that means there were user changes while progressively loading, save the document
-                self._saving_document = asyncio.create_task(
-                    self._maybe_save_document(self._saving_document, save_now=True)
-                )
+                self._request_save()
         finally:
             self._update_lock.release()
 
@@ -248,6 +477,8 @@ class DocumentRoom(YRoom):
         progressive: bool = False,
         initialized: asyncio.Event | None = None,
         finish: asyncio.Event | None = None,
+        cache_key: str | None = None,
+        size: int | None = None,
     ) -> None:
         """Load source content using a deterministic update.
 
@@ -257,10 +488,22 @@ class DocumentRoom(YRoom):
 
         The client ID needs to be fixed to a deterministic value, see:
         https://discuss.yjs.dev/t/initial-offline-value-of-a-shared-document/465
+
+        As the update is the same for identical content, it is looked up in the
+        source update cache with the given key before being built. Documents
+        larger than the offload threshold are built in a worker thread, only
+        the final update is applied on the event loop.
         """
-        source_ydoc: Doc = Doc(client_id=0)
-        source_document = YDOCS.get(self._file_type, YFILE)(source_ydoc)
+        if not progressive and cache_key is not None:
+            assert self._source_update_cache is not None
+            update = await self._source_update_cache.get(cache_key)
+            if update is not None:
+                self.ydoc.apply_update(update)
+                return
+
         if progressive:
+            source_ydoc: Doc = Doc(client_id=0)
+            source_document = YDOCS.get(self._file_type, YFILE)(source_ydoc)
             subscription = source_ydoc.observe(lambda event: self.ydoc.apply_update(event.update))
             try:
                 await source_document.aset_progressively(
@@ -272,15 +515,54 @@ class DocumentRoom(YRoom):
             finally:
                 source_ydoc.unobserve(subscription)
         else:
-            await source_document.aset(content)
-            self.ydoc.apply_update(source_ydoc.get_update())
+            if (
+                self._document_build_offload_threshold_mb is not None
+                and size is not None
+                and size > self._document_build_offload_threshold_mb * 1024 * 1024
+            ):
+                update = await asyncio.to_thread(build_source_update, self._file_type, content)
+            else:
+                update = await abuild_source_update(self._file_type, content)
+            self.ydoc.apply_update(update)
+            if cache_key is not None:
+                assert self._source_update_cache is not None
+                await self._source_update_cache.set(cache_key, update)
+
+    def _get_source_update_cache_key(self, model: dict[str, Any]) -> str | None:
+        """
+        Returns the key of the source content in the source update cache.
+
+            Parameters:
+                model (dict): The file model, with its content and hash.
+
+            Returns:
+                key (str | None): The cache key, or None if the update can't be cached.
+        """
+        if self._source_update_cache is None or model.get("hash") is None:
+            return None
+
+        return self._source_update_cache.key(
+            self._file_format, self._file_type, model["hash"], model.get("hash_algorithm")
+        )
 
-    def _emit(self, level: LogLevel, action: str | None = None, msg: str | None = None) -> None:
-        data = {"level": level.value, "room": self._room_id, "path": self._file.path}
+    def _emit(
+        self,
+        level: LogLevel,
+        action: str | None = None,
+        msg: str | None = None,
+        timings: dict[str, float] | None = None,
+    ) -> None:
+        data: dict[str, Any] = {
+            "level": level.value,
+            "room": self._room_id,
+            "path": self._file.path,
+        }
         if action:
             data["action"] = action
         if msg:
             data["msg"] = msg
+        if timings:
+            data["timings"] = dict(timings)
 
         self._logger.emit(schema_id=JUPYTER_COLLABORATION_EVENTS_URI, data=data)
 
@@ -288,19 +570,33 @@ class DocumentRoom(YRoom):
         """
         Stop the room.
 
-        Cancels the save task and unsubscribes from the file.
+        Cancels the save task, unsubscribes from the file and stops the store.
         """
         try:
             await super().stop()
         except RuntimeError:
             pass
         # TODO: Should we cancel or wait ?
+        self._cancel_save_timer()
         if self._saving_document:
             self._saving_document.cancel()
 
         self._document.unobserve()
+        self.awareness.unobserve(self._awareness_subscription)
         self._file.unobserve(self.room_id)
 
+        if (
+            self.ystore is not None
+            and self.ystore.started.is_set()
+            and not self.ystore.stopped.is_set()
+        ):
+            # write the updates kept in memory by the store and release its database connection
+            try:
+                await self.ystore.stop()
+            # the store class is configurable, its errors must not prevent stopping the room
+            except Exception as e:  # noqa: BLE001
+                self.log.error("Error stopping the store of room %s: %s", self._room_id, e)
+
     def create_task(self, aw):
         task = asyncio.create_task(aw)
         self._background_tasks.add(task)
@@ -356,9 +652,37 @@ class DocumentRoom(YRoom):
 
         async with self._update_lock:
             if await self._document.aget() != model["content"]:
-                await self._document.aset(model["content"])
+                await self._set_file_content(model["content"])
             self._document.dirty = False
 
+    async def _set_file_content(self, content: Any) -> None:
+        """
+        Overwrites the document with the content of the file, in a single transaction
+        changing only what differs.
+
+        The document already keeps its unchanged parts (e.g. the notebook cells and
+        their outputs), the sources of the notebook cells are changed by their text
+        differences instead of being replaced.
+
+            Parameters:
+                content (Any): The content of the file.
+        """
+        with self._document.ydoc.transaction():
+            if isinstance(self._document, YNotebook):
+                ycells = {}
+                for ycell in self._document.ycells:
+                    ycells.setdefault(ycell.get("id"), ycell)
+                for cell in content.get("cells", []):
+                    ycell = ycells.get(cell.get("id")) if cell.get("id") else None
+                    if ycell is None or not isinstance(ycell.get("source"), Text):
+                        continue
+                    source = cell.get("source", "")
+                    if isinstance(source, list):
+                        source = "".join(source)
+                    apply_text_diff(ycell["source"], source)
+
+            await self._document.aset(content)
+
     def _on_filepath_change(self) -> None:
         """
         Update the document path property.
@@ -376,32 +700,117 @@ class DocumentRoom(YRoom):
         ### Note:
             We auto save the content of the document every time there is a
             change in it. Since we could receive a high amount of changes
-            in a short period of time, we need create a task for saving the
-            document. This tasks are debounced (60 seconds by default) so we
-            need to cancel previous tasks before creating a new one.
+            in a short period of time, the save is debounced: each change
+            only pushes back the deadline of a single timer, which creates
+            the saving task once the deadline is reached.
         """
-        # Collect autosave values from all clients
-        autosave_states = [
-            state.get("autosave", True)
-            for state in self.awareness.states.values()
-            if state  # skip empty states
-        ]
+        if self._update_lock.locked():
+            return
+        if self._save_delay is None:
+            return
+        if not self._autosave:
+            return
 
-        # If no states exist (e.g., during tests), force autosave to be True
-        if not autosave_states:
-            autosave_states = [True]
+        if self._first_unsaved_change is None:
+            self._first_unsaved_change = monotonic()
+        loop = asyncio.get_running_loop()
+        self._save_deadline = loop.time() + self._get_save_delay()
+        if self._save_timer is None:
+            self._save_timer = loop.call_at(self._save_deadline, self._on_save_timer)
 
-        # Enable autosave if at least one client has it turned on
-        autosave = any(autosave_states)
+    @property
+    def _autosave(self) -> bool:
+        """
+        Whether the document is saved automatically.
 
-        if not autosave:
+        Autosave is enabled if at least one client has it turned on, or if there is
+        no client state (e.g., during tests).
+        """
+        if self._autosave_clients is None:
+            # Collect autosave values from all clients
+            self._autosave_clients = {}
+            self._autosave_enabled_clients = 0
+            for client_id, state in self.awareness.states.items():
+                self._set_client_autosave(client_id, state)
+
+        return self._autosave_enabled_clients > 0 or not self._autosave_clients
+
+    def _set_client_autosave(self, client_id: int, state: dict[str, Any] | None) -> None:
+        assert self._autosave_clients is not None
+        if self._autosave_clients.pop(client_id, False):
+            self._autosave_enabled_clients -= 1
+        if state:  # skip empty states
+            autosave = bool(state.get("autosave", True))
+            self._autosave_clients[client_id] = autosave
+            if autosave:
+                self._autosave_enabled_clients += 1
+
+    def _on_awareness_change(self, topic: str, changes: tuple[dict[str, Any], Any]) -> None:
+        """
+        Updates the autosave setting of the clients whose awareness state changed.
+
+            Parameters:
+                topic (str): `"update"` or `"change"` (`"change"` is triggered
+                    only if the states are modified).
+                changes (tuple[dict[str, Any], Any]): The changes and the origin of the changes.
+        """
+        if topic != "change" or self._autosave_clients is None:
             return
-        if self._update_lock.locked():
+        client_ids = changes[0]["added"] + changes[0]["updated"] + changes[0]["removed"]
+        for client_id in client_ids:
+            self._set_client_autosave(client_id, self.awareness.states.get(client_id))
+
+    def _on_save_timer(self) -> None:
+        """
+        Called when the save timer expires, saves the document if its deadline is reached.
+        """
+        self._save_timer = None
+        if self._save_deadline is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._save_deadline > loop.time():
+            # the deadline was pushed back by new changes
+            self._save_timer = loop.call_at(self._save_deadline, self._on_save_timer)
             return
 
+        self._save_deadline = None
+        self._request_save()
+
+    def _request_save(self) -> asyncio.Task:
+        """
+        Requests a save of the current state of the document.
+
+        ### Note:
+            A room has at most one save in flight and one queued save. A save
+            requested while another one is in flight is queued after it, instead
+            of cancelling it, and saves requested while a save is queued are
+            coalesced with it, as it reads the latest state of the document
+            when it starts.
+
+            Returns:
+                task (asyncio.Task): The saving task including the current state.
+        """
+        if self._save_queued:
+            assert self._saving_document is not None
+            return self._saving_document
+
+        saving_document = self._saving_document
+        if saving_document is not None and not saving_document.done():
+            self._save_queued = True
         self._saving_document = asyncio.create_task(
-            self._maybe_save_document(self._saving_document)
+            self._maybe_save_document(saving_document, save_now=True)
         )
+        return self._saving_document
+
+    def _cancel_save_timer(self) -> None:
+        """
+        Cancels the pending automatic save.
+        """
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+        self._save_deadline = None
 
     def _save_to_disc(self):
         """
@@ -410,55 +819,78 @@ class DocumentRoom(YRoom):
         if self._update_lock.locked():
             return
 
-        self._saving_document = asyncio.create_task(
-            self._maybe_save_document(self._saving_document, save_now=True)
-        )
-        return self._saving_document
+        # the manual save includes the changes of the pending automatic save
+        self._cancel_save_timer()
+        return self._request_save()
+
+    def _get_save_delay(self) -> float:
+        """
+        Returns the delay in seconds to wait before auto-saving the document.
+
+        The delay is the save delay, increased with the size of the file and the
+        duration of the last save, and with the minimum interval between saves.
+        It never exceeds the time left before the maximum wait since the first
+        unsaved change.
+        """
+        assert self._save_delay is not None
+        now = monotonic()
+        delay = self._save_delay + self._save_delay_per_mb * self._last_save_size / 1024 / 1024
+        delay = max(delay, self._save_cost_factor * self._last_save_duration)
+        if self._save_min_interval is not None and self._last_save_end is not None:
+            delay = max(delay, self._last_save_end + self._save_min_interval - now)
+        if self._save_max_wait is not None and self._first_unsaved_change is not None:
+            delay = min(delay, self._first_unsaved_change + self._save_max_wait - now)
+        return max(delay, 0)
 
     async def _maybe_save_document(
         self, saving_document: asyncio.Task | None, save_now: bool = False
-    ) -> None:
+    ) -> str | None:
         """
         Saves the content of the document to disk.
 
         ### Note:
             There is a save delay to debounce the save since we could receive a high
-            amount of changes in a short period of time. This way we can cancel the
-            previous save. When save_now is True, the delay is skipped and the save
-            executes immediately.
+            amount of changes in a short period of time. When save_now is True, the
+            delay is skipped and the save executes immediately. The save starts once
+            the previous save is done, so that they don't overlap.
 
             Parameters:
-                saving_document: The previous saving task to cancel if needed.
+                saving_document: The previous saving task to wait for if needed.
                 save_now: If True, skip the debounce delay, and save immediately.
                           This is used when manually saving.
+
+            Returns:
+                status (str | None): "skipped" if the document didn't change since its last save.
         """
         if self._save_delay is None and not save_now:
             return
-        if saving_document is not None and not saving_document.done():
-            # the document is being saved, cancel that
-            saving_document.cancel()
 
         # all async code (i.e. await statements) must be part of this try/except block
         # because this coroutine is run in a cancellable task and cancellation is handled here
 
         try:
+            if saving_document is not None and not saving_document.done():
+                # the document is being saved, this save picks up the changes made since
+                await asyncio.wait([saving_document])
+            if self._saving_document is asyncio.current_task():
+                # the next requested save is queued after this one
+                self._save_queued = False
+
             # When save_now is False, wait X seconds of inactivity before saving (auto-save).
             # When save_now is True, save immediately without debounce delay (manual save).
             if not save_now and self._save_delay is not None:
-                await asyncio.sleep(self._save_delay)
+                await asyncio.sleep(self._get_save_delay())
+
+            if encode_document_snapshot(self.ydoc) == self._saved_snapshot:
+                self._first_unsaved_change = None
+                self.log.info("No changes to save in room %s", self._room_id)
+                return "skipped"
 
             self.log.info("Saving the content from room %s", self._room_id)
-            saved_model = await self._file.maybe_save_content(
-                {
-                    "format": self._file_format,
-                    "type": self._file_type,
-                    "content": await self._document.aget(),
-                }
-            )
-            if saved_model:
-                async with self._update_lock:
-                    self._document.dirty = False
-                    self._document.hash = saved_model["hash"]
+            if self._save_scheduler is None:
+                await self._save_content()
+            else:
+                await self._save_scheduler.save(self._room_id, self._save_content)
 
             self._emit(LogLevel.INFO, "save", "Content saved.")
 
@@ -477,7 +909,7 @@ class DocumentRoom(YRoom):
 
             async with self._update_lock:
                 if await self._document.aget() != model["content"]:
-                    await self._document.aset(model["content"])
+                    await self._set_file_content(model["content"])
                 self._document.dirty = False
 
             self._emit(LogLevel.INFO, "overwrite", "Out-of-band changes while saving.")
@@ -487,6 +919,59 @@ class DocumentRoom(YRoom):
             self.log.error(msg, exc_info=e)
             self._emit(LogLevel.ERROR, None, msg)
 
+    async def _save_content(self) -> dict[str, Any] | None:
+        """
+        Saves the current content of the document with the file loader.
+
+        The save scheduler may run it a while after the save was requested, so
+        the content is only read when the save starts. Documents larger than the
+        save offload threshold are read in a worker thread from an update of the
+        document, which is encoded on the event loop.
+
+            Returns:
+                model (dict | None): The saved model, or None if the file wasn't saved.
+        """
+        self._first_unsaved_change = None
+        save_start = monotonic()
+        snapshot: bytes | None = encode_document_snapshot(self.ydoc)
+        content = await self._get_content_to_save()
+        saved_model = await self._file.maybe_save_content(
+            {
+                "format": self._file_format,
+                "type": self._file_type,
+                "content": content,
+            }
+        )
+        self._last_save_end = monotonic()
+        self._last_save_duration = self._last_save_end - save_start
+        if saved_model:
+            self._last_save_size = saved_model.get("size") or 0
+            async with self._update_lock:
+                # the fingerprint is only valid if the document didn't change while saving
+                unchanged = encode_document_snapshot(self.ydoc) == snapshot
+                self._document.dirty = False
+                self._document.hash = saved_model["hash"]
+                snapshot = encode_document_snapshot(self.ydoc) if unchanged else None
+
+            self._saved_snapshot = snapshot
+            if snapshot is not None:
+                await self._set_fingerprint(saved_model["hash"], snapshot)
+
+        return saved_model
+
+    async def _get_content_to_save(self) -> Any:
+        """
+        Returns the content of the document to save.
+        """
+        if self._document_save_offload_threshold_mb is None:
+            return await self._document.aget()
+
+        update = self.ydoc.get_update()
+        if len(update) <= self._document_save_offload_threshold_mb * 1024 * 1024:
+            return await self._document.aget()
+
+        return await asyncio.to_thread(read_document_content, self._file_type, update)
+
 
 class TransientRoom(YRoom):
     """A Y room for sharing state (e.g. awareness)."""
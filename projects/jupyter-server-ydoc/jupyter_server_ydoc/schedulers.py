@@ -0,0 +1,398 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import Any
+
+
+class AdmissionQueueFull(Exception):
+    pass
+
+
+class RoomInitializationScheduler:
+    """
+    Limits the number of rooms initializing at the same time.
+
+    Clients opening a room that isn't initialized wait for an admission before
+    initializing it. Clients of a room that is already admitted are admitted
+    right away, as they wait for the same initialization. When a room finishes
+    its initialization, the next admitted room is the one with the most waiting
+    clients, and the oldest one on a tie.
+    """
+
+    def __init__(self, max_concurrency: int | None, max_queue_size: int | None = None) -> None:
+        """
+        Args:
+            max_concurrency: Maximum number of rooms initializing at the same time;
+                if None the number of rooms is not limited
+            max_queue_size: [optional] Maximum number of waiting clients; default
+                the number of waiting clients is not limited
+        """
+        self._max_concurrency = max_concurrency
+        self._max_queue_size = max_queue_size
+        # The waiting clients by room, in order of arrival of the rooms
+        self._waiters: dict[str, list[asyncio.Future[None]]] = {}
+        # The number of admitted clients by room
+        self._admitted: dict[str, int] = {}
+
+        self.admissions = 0
+        self.rejections = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def active(self) -> int:
+        """
+        The number of rooms being initialized.
+        """
+        return len(self._admitted)
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        The number of clients waiting for an admission.
+        """
+        return sum(len(futures) for futures in self._waiters.values())
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        """
+        The metrics of the scheduler.
+        """
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "admissions": self.admissions,
+            "rejections": self.rejections,
+            "average_wait_time": (
+                self.total_wait_time / self.admissions if self.admissions else 0.0
+            ),
+            "max_wait_time": self.max_wait_time,
+        }
+
+    @asynccontextmanager
+    async def admit(self, room_id: str) -> AsyncIterator[float]:
+        """
+        Waits for the admission of a client to initialize a room.
+
+            Parameters:
+                room_id (str): The room ID.
+
+            Yields:
+                wait_time (float): The time in seconds spent waiting for the admission.
+
+            Raises:
+                AdmissionQueueFull: If the client can't wait as the queue is full.
+        """
+        wait_time = await self._acquire(room_id)
+        try:
+            yield wait_time
+        finally:
+            self._release(room_id)
+
+    async def _acquire(self, room_id: str) -> float:
+        start = monotonic()
+        if room_id in self._admitted or (not self._waiters and self._has_free_slot()):
+            self._admitted[room_id] = self._admitted.get(room_id, 0) + 1
+            self._record_wait_time(0.0)
+            return 0.0
+
+        if self._max_queue_size is not None and self.queue_depth >= self._max_queue_size:
+            self.rejections += 1
+            raise AdmissionQueueFull(f"Too many clients waiting to initialize a room ({room_id})")
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(room_id, []).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._remove_waiter(room_id, future)
+            else:
+                # the client was admitted before being cancelled
+                self._release(room_id)
+            raise
+
+        wait_time = monotonic() - start
+        self._record_wait_time(wait_time)
+        return wait_time
+
+    def _release(self, room_id: str) -> None:
+        self._admitted[room_id] -= 1
+        if self._admitted[room_id] == 0:
+            del self._admitted[room_id]
+            self._admit_next()
+
+    def _admit_next(self) -> None:
+        while self._waiters and self._has_free_slot():
+            # max returns the first room on a tie, which is the oldest one
+            room_id = max(self._waiters, key=lambda room_id: len(self._waiters[room_id]))
+            # the clients cancelled while waiting are removed once their task resumes
+            futures = [future for future in self._waiters.pop(room_id) if not future.done()]
+            if not futures:
+                continue
+            self._admitted[room_id] = len(futures)
+            for future in futures:
+                future.set_result(None)
+
+    def _remove_waiter(self, room_id: str, future: asyncio.Future[None]) -> None:
+        futures = self._waiters.get(room_id)
+        if futures is None or future not in futures:
+            # the waiters of the room were already admitted
+            return
+        futures.remove(future)
+        if not futures:
+            del self._waiters[room_id]
+
+    def _has_free_slot(self) -> bool:
+        return self._max_concurrency is None or len(self._admitted) < self._max_concurrency
+
+    def _record_wait_time(self, wait_time: float) -> None:
+        self.admissions += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
+class SaveScheduler:
+    """
+    Runs the saves of all the rooms with a bounded number of workers.
+
+    Rooms have at most one pending save: a save requested while another one is
+    pending for the same room is coalesced with it, and the latest save function
+    is used. Pending saves run in the order their rooms first requested them, and
+    a room only has one save running at a time, so that busy rooms can't starve
+    the others.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        """
+        Args:
+            max_concurrency: Maximum number of saves running at the same time
+        """
+        self._max_concurrency = max_concurrency
+        # The pending saves by room, in order of request
+        self._pending: dict[
+            str, tuple[Callable[[], Awaitable[dict[str, Any] | None]], asyncio.Future, float]
+        ] = {}
+        self._running: set[str] = set()
+        self._background_tasks: set[asyncio.Task] = set()
+
+        self.saves = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.bytes_written = 0
+
+    @property
+    def queue_length(self) -> int:
+        """
+        The number of pending saves.
+        """
+        return len(self._pending)
+
+    @property
+    def running(self) -> int:
+        """
+        The number of saves running.
+        """
+        return len(self._running)
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        """
+        The metrics of the scheduler. The latency of a save includes its time in the queue.
+        """
+        return {
+            "queue_length": self.queue_length,
+            "running": self.running,
+            "saves": self.saves,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "average_latency": self.total_latency / self.saves if self.saves else 0.0,
+            "max_latency": self.max_latency,
+            "bytes_written": self.bytes_written,
+        }
+
+    async def save(
+        self, room_id: str, save: Callable[[], Awaitable[dict[str, Any] | None]]
+    ) -> dict[str, Any] | None:
+        """
+        Schedules the save of a room and waits for it.
+
+        The save runs even if the caller is cancelled.
+
+            Parameters:
+                room_id (str): The room ID.
+                save (Callable): The function saving the room, returning the saved model.
+
+            Returns:
+                model (dict | None): The saved model.
+        """
+        pending = self._pending.get(room_id)
+        if pending is None:
+            future: asyncio.Future = asyncio.get_running_loop().create_future()
+            self._pending[room_id] = (save, future, monotonic())
+        else:
+            _, future, requested_at = pending
+            self._pending[room_id] = (save, future, requested_at)
+            self.coalesced += 1
+        self._dispatch()
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        while len(self._running) < self._max_concurrency:
+            room_id = next(
+                (room_id for room_id in self._pending if room_id not in self._running), None
+            )
+            if room_id is None:
+                return
+            save, future, requested_at = self._pending.pop(room_id)
+            self._running.add(room_id)
+            task = asyncio.create_task(self._run(room_id, save, future, requested_at))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _run(
+        self,
+        room_id: str,
+        save: Callable[[], Awaitable[dict[str, Any] | None]],
+        future: asyncio.Future,
+        requested_at: float,
+    ) -> None:
+        try:
+            model = await save()
+        except BaseException as e:
+            self.failures += 1
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # the exception is raised to the callers
+                future.exception()
+            if not isinstance(e, Exception):
+                raise
+        else:
+            latency = monotonic() - requested_at
+            self.saves += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if model:
+                self.bytes_written += model.get("size") or 0
+            future.set_result(model)
+        finally:
+            self._running.discard(room_id)
+            self._dispatch()
+
+
+class ThreadPoolScheduler:
+    """
+    Runs blocking calls in a bounded pool of threads, so that they don't block
+    the event loop, e.g. the calls of synchronous contents managers.
+
+    Calls wait in the queue of the pool while all its threads are busy. The pool
+    is created on the first call, and a shut down pool is recreated on the next one.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "") -> None:
+        """
+        Args:
+            max_workers: Maximum number of threads running calls at the same time
+            thread_name_prefix: [optional] Prefix of the names of the threads
+        """
+        self._max_workers = max_workers
+        self._thread_name_prefix = thread_name_prefix
+        self._executor: ThreadPoolExecutor | None = None
+        # The start times of the submitted calls, None while they wait in the queue
+        self._calls: list[list[float | None]] = []
+
+        self.calls = 0
+        self.failures = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def queue_length(self) -> int:
+        """
+        The number of calls waiting for a thread.
+        """
+        return sum(1 for started in self._calls if started[0] is None)
+
+    @property
+    def running(self) -> int:
+        """
+        The number of calls running in a thread.
+        """
+        return len(self._calls) - self.queue_length
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        """
+        The metrics of the scheduler. The latency of a call includes its time in the queue.
+        """
+        return {
+            "queue_length": self.queue_length,
+            "running": self.running,
+            "calls": self.calls,
+            "failures": self.failures,
+            "average_wait_time": self.total_wait_time / self.calls if self.calls else 0.0,
+            "max_wait_time": self.max_wait_time,
+            "average_latency": self.total_latency / self.calls if self.calls else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Runs a blocking call in a thread of the pool and waits for its result.
+
+            Parameters:
+                func (Callable): The blocking function.
+                args: The positional arguments of the function.
+                kwargs: The keyword arguments of the function.
+
+            Returns:
+                result (Any): The result of the function.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self._max_workers, thread_name_prefix=self._thread_name_prefix
+            )
+        submitted_at = monotonic()
+        started: list[float | None] = [None]
+
+        def call() -> Any:
+            started[0] = monotonic()
+            return func(*args, **kwargs)
+
+        self._calls.append(started)
+        try:
+            return await asyncio.wrap_future(self._executor.submit(call))
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self._calls.remove(started)
+            if started[0] is not None:
+                wait_time = started[0] - submitted_at
+                latency = monotonic() - submitted_at
+                self.calls += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+    def shutdown(self) -> None:
+        """
+        Shuts down the pool, cancelling the calls waiting for a thread.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,9 +1,20 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
+from __future__ import annotations
+
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from typing import ClassVar
+
+import anyio
+from pycrdt import Doc, merge_updates
+from pycrdt.store import BaseYStore
 from pycrdt.store import SQLiteYStore as _SQLiteYStore
 from pycrdt.store import TempFileYStore as _TempFileYStore
-from traitlets import Int, Unicode
+from sqlite_anyio import Connection
+from traitlets import Bool, Enum, Float, Int, Unicode
 from traitlets.config import LoggingConfigurable
 
 
@@ -15,6 +26,22 @@ class TempFileYStore(LoggingConfigurable, _TempFileYStore, metaclass=TempFileYSt
     prefix_dir = "jupyter_ystore_"
 
 
+class _SQLiteDatabase:
+    """
+    A connection to an SQLite database, shared by the stores of the documents.
+
+    The stores use the connection one transaction at a time, holding the lock.
+    """
+
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.path = path
+        self.loop = loop
+        self.connection: Connection | None = None
+        self.lock = anyio.Lock()
+        self.initialized = anyio.Event()
+        self.users = 0
+
+
 class SQLiteYStoreMetaclass(type(LoggingConfigurable), type(_SQLiteYStore)):  # type: ignore
     pass
 
@@ -42,3 +69,246 @@ class SQLiteYStore(LoggingConfigurable, _SQLiteYStore, metaclass=SQLiteYStoreMet
         Deprecated in favor of 'squash_after_inactivity_of'.
         Defaults to None (document history is never cleared).""",
     )
+
+    write_batch_delay = Float(
+        None,
+        allow_none=True,
+        config=True,
+        help="""The maximum delay in seconds to keep the updates of a document in memory before
+        writing them to the database in a single transaction, merged in a single update. It bounds
+        the updates lost if the server crashes, and the precision of the document timeline.
+        Defaults to None (each update is written in its own transaction).""",
+    )
+    write_batch_size = Int(
+        100,
+        config=True,
+        help="""The maximum number of updates of a document kept in memory, after which they are
+        written to the database right away. Only used with 'write_batch_delay'. Defaults to 100.""",
+    )
+
+    shared_connection = Bool(
+        True,
+        config=True,
+        help="""Whether the stores of the documents share a single connection to the database.
+        The database schema is then only checked by the first store, and the transactions of
+        the documents don't contend for the database lock. Defaults to True.""",
+    )
+    journal_mode = Enum(
+        ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"],
+        "WAL",
+        allow_none=True,
+        config=True,
+        help="""The SQLite journal mode of the database, one of 'DELETE', 'TRUNCATE', 'PERSIST',
+        'MEMORY', 'WAL' or 'OFF'. In 'WAL' mode, reading the database doesn't wait for the
+        writes. Defaults to 'WAL'. If None, the mode is not changed.""",
+    )
+
+    # The shared connections by database path
+    _databases: ClassVar[dict[str, _SQLiteDatabase]] = {}
+    _database: _SQLiteDatabase | None = None
+    _fingerprints_table_created = False
+    # The updates kept in memory, and the task writing them after the batch delay
+    _pending_updates: list[bytes] | None = None
+    _flush_task: asyncio.Task | None = None
+    flushes = 0
+    batched_updates = 0
+
+    async def write(self, data: bytes) -> None:
+        """
+        Stores an update.
+
+        With a write batch delay, the update is kept in memory and written with the next
+        updates of the document, after the delay or when the batch is full.
+
+            Parameters:
+                data (bytes): The update to store.
+        """
+        if self.write_batch_delay is None:
+            await super().write(data)
+            return
+
+        if self.db_initialized is None:
+            raise RuntimeError("YStore not started")
+        if self._pending_updates is None:
+            self._pending_updates = []
+        self._pending_updates.append(data)
+        if len(self._pending_updates) >= self.write_batch_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_delay())
+
+    async def flush(self) -> None:
+        """
+        Writes the updates kept in memory to the database, in a single transaction.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not self._pending_updates:
+            return
+
+        updates, self._pending_updates = self._pending_updates, []
+        try:
+            await super().write(merge_updates(*updates) if len(updates) > 1 else updates[0])
+        except BaseException:
+            # keep the updates for the next write
+            self._pending_updates[:0] = updates
+            raise
+        self.flushes += 1
+        self.batched_updates += len(updates)
+
+    async def _flush_after_delay(self) -> None:
+        assert self.write_batch_delay is not None
+        await asyncio.sleep(self.write_batch_delay)
+        # the task must not cancel itself
+        self._flush_task = None
+        try:
+            await self.flush()
+        # the error would otherwise be lost in the task, the next flush retries the updates
+        except Exception as e:  # noqa: BLE001
+            self.log.error("Error writing the updates of %s: %s", self.path, e, exc_info=e)
+
+    async def apply_updates(self, ydoc: Doc) -> None:
+        await self.flush()
+        await super().apply_updates(ydoc)
+
+    async def read(self) -> AsyncIterator[tuple[bytes, bytes, float]]:  # type: ignore[override]
+        await self.flush()
+        async for update in super().read():
+            yield update
+
+    async def stop(self) -> None:
+        await self.flush()
+        database, self._database = self._database, None
+        if database is None:
+            await super().stop()
+            return
+
+        # the shared connection is closed by the last store using it
+        database.users -= 1
+        if database.users == 0:
+            if self._databases.get(database.path) is database:
+                del self._databases[database.path]
+            if database.connection is not None:
+                async with database.lock:
+                    await database.connection.close()
+        await BaseYStore.stop(self)
+
+    async def _init_db(self) -> None:
+        if not self.shared_connection:
+            await super()._init_db()
+            await self._set_journal_mode()
+            return
+
+        path = self.db_path if self.db_path == ":memory:" else os.path.abspath(self.db_path)
+        loop = asyncio.get_running_loop()
+        database = self._databases.get(path)
+        # a connection opened by another event loop cannot be used
+        if database is None or database.loop is not loop:
+            database = self._databases[path] = _SQLiteDatabase(path, loop)
+        database.users += 1
+        self._database = database
+        self.lock = database.lock
+
+        if database.users > 1:
+            await database.initialized.wait()
+            if database.connection is None:
+                raise RuntimeError(f"Cannot open the YStore database {self.db_path}")
+            self._db = database.connection
+            assert self.db_initialized is not None
+            self.db_initialized.set()
+            return
+
+        try:
+            # only the first store checks the schema of the database
+            await super()._init_db()
+            await self._set_journal_mode()
+            database.connection = self._db
+        finally:
+            if database.connection is None and self._databases.get(path) is database:
+                del self._databases[path]
+            database.initialized.set()
+
+    async def _set_journal_mode(self) -> None:
+        if self.journal_mode is None:
+            return
+        async with self.lock:
+            cursor = await self._db.cursor()
+            await cursor.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+
+    async def get_fingerprint(self) -> tuple[str, bytes] | None:
+        """
+        Returns the fingerprint of the source content stored next to the document updates.
+
+            Returns:
+                fingerprint (tuple[str, bytes] | None): The content hash and the document
+                    snapshot it matches, or None if no fingerprint was stored.
+        """
+        if self.db_initialized is None:
+            raise RuntimeError("YStore not started")
+        await self.db_initialized.wait()
+        fingerprint = None
+        async with self.lock, self._db:
+            cursor = await self._db.cursor()
+            await self._create_fingerprints_table(cursor)
+            await cursor.execute(
+                "SELECT hash, snapshot FROM yfingerprints WHERE path = ?",
+                (self.path,),
+            )
+            row = await cursor.fetchone()
+            if row is not None:
+                fingerprint = (row[0], row[1])
+        return fingerprint
+
+    async def set_fingerprint(self, hash: str, snapshot: bytes) -> None:
+        """
+        Stores the fingerprint of the source content next to the document updates.
+
+            Parameters:
+                hash (str): The hash of the source content.
+                snapshot (bytes): The snapshot of the document matching the source content.
+        """
+        if self.db_initialized is None:
+            raise RuntimeError("YStore not started")
+        await self.db_initialized.wait()
+        async with self.lock, self._db:
+            cursor = await self._db.cursor()
+            await self._create_fingerprints_table(cursor)
+            await cursor.execute(
+                "INSERT OR REPLACE INTO yfingerprints (path, hash, snapshot) VALUES (?, ?, ?)",
+                (self.path, hash, snapshot),
+            )
+
+    async def get_recent_paths(self, limit: int) -> list[str]:
+        """
+        Returns the paths of the most recently updated documents in the database.
+
+            Parameters:
+                limit (int): Maximum number of paths to return.
+
+            Returns:
+                paths (list[str]): The document paths, most recently updated first.
+        """
+        if self.db_initialized is None:
+            raise RuntimeError("YStore not started")
+        await self.db_initialized.wait()
+        async with self.lock, self._db:
+            cursor = await self._db.cursor()
+            await cursor.execute(
+                "SELECT path FROM yupdates GROUP BY path ORDER BY MAX(timestamp) DESC LIMIT ?",
+                (limit,),
+            )
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def _create_fingerprints_table(self, cursor) -> None:
+        if self._fingerprints_table_created:
+            return
+        await cursor.execute(
+            "CREATE TABLE IF NOT EXISTS yfingerprints ("
+            "path TEXT NOT NULL, "
+            "hash TEXT NOT NULL, "
+            "snapshot BLOB NOT NULL, "
+            "PRIMARY KEY(path)"
+            ")"
+        )
+        self._fingerprints_table_created = True
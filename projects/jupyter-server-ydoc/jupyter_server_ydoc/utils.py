@@ -4,9 +4,16 @@ import asyncio
 import json
 import os
 import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from difflib import SequenceMatcher
 from enum import Enum, IntEnum
+from itertools import accumulate
 from pathlib import Path
+from time import monotonic
+
+from pycrdt import Doc, Text
 
 from ._version import __version__  # noqa
 
@@ -19,6 +26,7 @@ JUPYTER_COLLABORATION_AWARENESS_EVENTS_URI = (
 JUPYTER_COLLABORATION_FORK_EVENTS_URI = "https://schema.jupyter.org/jupyter_collaboration/fork/v1"
 AWARENESS_EVENTS_SCHEMA_PATH = EVENTS_FOLDER_PATH / "awareness.yaml"
 FORK_EVENTS_SCHEMA_PATH = EVENTS_FOLDER_PATH / "fork.yaml"
+CONTENTS_EVENTS_URI = "https://events.jupyter.org/jupyter_server/contents_service/v1"
 SERVER_SESSION = str(uuid.uuid4())
 YDOC_SERVER_VERSION = __version__
 
@@ -87,6 +95,117 @@ def room_id_from_encoded_path(encoded_path: str) -> str:
     return encoded_path.split("/")[-1]
 
 
+def encode_document_snapshot(ydoc: Doc) -> bytes:
+    """
+    Encodes a snapshot of a Y document, made of its state vector and its delete set.
+
+    Two snapshots of a document are equal if no change (insertion or deletion)
+    was made to the document in between.
+
+        Parameters:
+            ydoc (Doc): The Y document.
+
+        Returns:
+            snapshot (bytes): The encoded snapshot.
+    """
+    state = ydoc.get_state()
+    # An update from the current state has no structs, only the delete set
+    return state + ydoc.get_update(state)
+
+
+# Maximum total product of the lengths of the changed blocks of lines diffed character by
+# character in a text, as the diff takes quadratic time
+MAX_CHAR_DIFF_SIZE = 250_000
+
+
+def apply_text_diff(ytext: Text, new: str, min_similarity: float = 0.6) -> None:
+    """
+    Changes the content of a shared text to a new value with the operations of their
+    difference, so that the unchanged parts of the text are kept.
+
+    The texts are diffed line by line, then the changed lines character by character
+    if they are small enough, so that the time taken is bounded. Very different texts are
+    replaced entirely, which makes a smaller update than a large number of operations.
+
+        Parameters:
+            ytext (Text): The shared text.
+            new (str): The new value of the text.
+            min_similarity (float): [optional] Minimum similarity ratio of the texts to
+                apply their difference, default 0.6.
+    """
+    old = str(ytext)
+    if old == new:
+        return
+
+    # only the differing middle of the texts is diffed, as changes are mostly local
+    prefix = len(os.path.commonprefix([old, new]))
+    suffix = len(os.path.commonprefix([old[prefix:][::-1], new[prefix:][::-1]]))
+    old_middle = old[prefix : len(old) - suffix]
+    new_middle = new[prefix : len(new) - suffix]
+    old_lines = old_middle.splitlines(keepends=True)
+    new_lines = new_middle.splitlines(keepends=True)
+    old_offsets = [0, *accumulate(map(len, old_lines))]
+    new_offsets = [0, *accumulate(map(len, new_lines))]
+
+    matches = prefix + suffix
+    opcodes = []
+    char_diff_budget = MAX_CHAR_DIFF_SIZE
+    for tag, i1, i2, j1, j2 in SequenceMatcher(a=old_lines, b=new_lines).get_opcodes():
+        i1, i2, j1, j2 = old_offsets[i1], old_offsets[i2], new_offsets[j1], new_offsets[j2]
+        if tag == "equal":
+            matches += i2 - i1
+            continue
+        if tag == "replace" and (i2 - i1) * (j2 - j1) <= char_diff_budget:
+            char_diff_budget -= (i2 - i1) * (j2 - j1)
+            matcher = SequenceMatcher(a=old_middle[i1:i2], b=new_middle[j1:j2], autojunk=False)
+            # the cheap upper bounds of the similarity avoid diffing very different lines
+            if (
+                matcher.real_quick_ratio() >= min_similarity
+                and matcher.quick_ratio() >= min_similarity
+            ):
+                for char_tag, k1, k2, l1, l2 in matcher.get_opcodes():
+                    if char_tag == "equal":
+                        matches += k2 - k1
+                    else:
+                        opcodes.append((char_tag, i1 + k1, i1 + k2, j1 + l1, j1 + l2))
+                continue
+        opcodes.append((tag, i1, i2, j1, j2))
+
+    if 2 * matches < min_similarity * (len(old) + len(new)):
+        ytext.clear()
+        ytext += new
+        return
+
+    # Shared texts are indexed by UTF-8 bytes, the differences by characters
+    offsets = [0, *accumulate(len(char.encode("utf-8")) for char in old)]
+    with ytext.doc.transaction():
+        # apply the operations from the end, so that the offsets of the next ones don't move
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            i1, i2 = offsets[prefix + i1], offsets[prefix + i2]
+            if tag in ("replace", "delete"):
+                del ytext[i1:i2]
+            if tag in ("replace", "insert"):
+                ytext.insert(i1, new[prefix + j1 : prefix + j2])
+
+
+@contextmanager
+def record_duration(timings: dict[str, float], phase: str) -> Iterator[None]:
+    """
+    Records the duration in seconds of a phase, measured with a monotonic clock.
+
+    The duration is recorded even if the phase fails.
+
+        Parameters:
+            timings (dict[str, float]): The durations of the phases, by name.
+            phase (str): Name of the phase.
+    """
+    start = monotonic()
+    try:
+        yield
+    finally:
+        timings[phase] = monotonic() - start
+
+
 def _get_jupyter_session_store(root_dir: str, session_store_path: str | None = None) -> Path:
     """Return path to the session store file.
 
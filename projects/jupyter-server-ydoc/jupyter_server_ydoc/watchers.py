@@ -0,0 +1,174 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from logging import Logger, getLogger
+
+# The time in milliseconds after which a watchfiles watcher without changes yields
+WATCHER_TIMEOUT = 500
+
+
+class BaseFileWatcher(ABC):
+    """
+    Base class of the file watchers, notifying the changes of files on the local disk.
+
+    File watchers replace the polling of the files by the file loaders. The callback
+    is called with the paths of the watched files that changed, as passed to `watch`.
+    The error callback is called when the watcher fails and stops notifying changes.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[set[str]], None],
+        log: Logger | None = None,
+        error_callback: Callable[[Exception], None] | None = None,
+    ) -> None:
+        """
+        Args:
+            callback: Function called with the paths of the changed files
+            log: [optional] Server log; default to local logger
+            error_callback: [optional] Function called with the error of a failed watcher
+        """
+        self._callback = callback
+        self._log = log or getLogger(__name__)
+        self._error_callback = error_callback
+
+    @abstractmethod
+    def watch(self, os_path: str) -> None:
+        """
+        Starts watching a file.
+
+            Parameters:
+                os_path (str): The path of the file on disk.
+        """
+        ...
+
+    @abstractmethod
+    def unwatch(self, os_path: str) -> None:
+        """
+        Stops watching a file.
+
+            Parameters:
+                os_path (str): The path of the file on disk.
+        """
+        ...
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """
+        Stops watching all the files.
+        """
+        ...
+
+
+class WatchfilesFileWatcher(BaseFileWatcher):
+    """
+    A file watcher using the notifications of the operating system (e.g. inotify),
+    through the watchfiles package.
+
+    The directories of the watched files are watched, as files saved atomically are
+    replaced. The watch is restarted when the set of directories changes, and all the
+    watched files are then notified once the new watch is running, as their changes
+    during the restart are missed.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[set[str]], None],
+        log: Logger | None = None,
+        error_callback: Callable[[Exception], None] | None = None,
+        step: int = 10,
+        debounce: int = 100,
+    ) -> None:
+        """
+        Args:
+            callback: Function called with the paths of the changed files
+            log: [optional] Server log; default to local logger
+            error_callback: [optional] Function called with the error of a failed watcher
+            step: [optional] Time in milliseconds without changes to wait for before
+                notifying them; default 10ms
+            debounce: [optional] Maximum time in milliseconds to group changes; default 100ms
+        """
+        # Fail early if watchfiles is not installed
+        from watchfiles import awatch  # noqa: F401
+
+        super().__init__(callback, log, error_callback)
+        self._step = step
+        self._debounce = debounce
+        # The watched paths by real path, as reported by the operating system
+        self._paths: dict[str, str] = {}
+        self._directories: set[str] = set()
+        self._watcher: asyncio.Task | None = None
+        self._background_tasks: set[asyncio.Task] = set()
+
+    def watch(self, os_path: str) -> None:
+        self._paths[os.path.realpath(os_path)] = os_path
+        self._restart()
+
+    def unwatch(self, os_path: str) -> None:
+        self._paths.pop(os.path.realpath(os_path), None)
+        self._restart()
+
+    async def stop(self) -> None:
+        self._paths.clear()
+        self._restart()
+        # wait for the watcher threads to stop
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+    def _restart(self) -> None:
+        directories = {os.path.dirname(path) for path in self._paths}
+        if directories == self._directories:
+            return
+
+        self._directories = directories
+        restarted = self._watcher is not None
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        if directories:
+            self._watcher = asyncio.create_task(self._watch(directories, restarted))
+            self._background_tasks.add(self._watcher)
+            self._watcher.add_done_callback(self._background_tasks.discard)
+
+    async def _watch(self, directories: set[str], restarted: bool) -> None:
+        from watchfiles import awatch
+
+        self._log.debug("Watching directories: %s", directories)
+        changes = awatch(
+            *directories,
+            watch_filter=lambda change, path: path in self._paths,
+            step=self._step,
+            debounce=self._debounce,
+            recursive=False,
+            ignore_permission_denied=True,
+            # yield without changes as well, the first yield confirms the directories are watched
+            rust_timeout=WATCHER_TIMEOUT,
+            yield_on_timeout=True,
+        )
+        try:
+            notify_all = restarted
+            async for raw_changes in changes:
+                if notify_all:
+                    # notify the files which may have changed since the previous watch stopped
+                    notify_all = False
+                    self._callback(set(self._paths.values()))
+                self._notify(raw_changes)
+        # any error, e.g. of the watcher or the callback, falls back to the error callback
+        except Exception as e:  # noqa: BLE001
+            self._log.error("Error watching directories %s: %s", directories, e, exc_info=e)
+            # the files are not watched anymore
+            self._directories = set()
+            if self._watcher is asyncio.current_task():
+                self._watcher = None
+            if self._error_callback is not None:
+                self._error_callback(e)
+
+    def _notify(self, changes: set[tuple[object, str]]) -> None:
+        paths = {self._paths[path] for _, path in changes if path in self._paths}
+        if paths:
+            self._callback(paths)
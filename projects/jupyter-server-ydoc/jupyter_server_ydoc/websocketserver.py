@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import asyncio
+import gc
 from collections.abc import Callable
 from logging import Logger
 from typing import Any
@@ -12,6 +13,12 @@ from pycrdt import Channel
 from pycrdt.store import BaseYStore
 from pycrdt.websocket import WebsocketServer, YRoom
 
+from .loaders import FileLoaderMapping
+from .utils import decode_file_path
+
+# The delay (in seconds) after the deletion of a room to collect its garbage
+GARBAGE_COLLECTION_DELAY = 1
+
 
 class RoomNotFound(LookupError):
     pass
@@ -56,6 +63,7 @@ class JupyterWebsocketServer(WebsocketServer):
         self.connected_users: dict[Any, Any] = {}
         # Async loop is not yet ready at the object instantiation
         self.monitor_task: asyncio.Task | None = None
+        self._garbage_collection: asyncio.TimerHandle | None = None
 
     async def clean(self):
         # TODO: should we wait for any save task?
@@ -89,6 +97,54 @@ class JupyterWebsocketServer(WebsocketServer):
                 self.log.warning(msg)
                 self.log.debug("Pending tasks: %r", pending)
 
+    async def delete_room(self, *, name: str | None = None, room: YRoom | None = None) -> None:
+        """
+        Deletes a room, and collects its garbage on the event loop thread.
+
+        A stopped room is kept in reference cycles which hold pycrdt objects, and these
+        can only be dropped by the thread which created them. As a garbage collection is
+        run by the thread which triggers it, e.g. one running a call to the contents manager,
+        the garbage is collected on the event loop shortly after the room is deleted, once
+        its tasks and callers released it. The rooms deleted meanwhile share the collection.
+
+            Parameters:
+                name (str | None): The ID of the room to delete (if `room` is not passed).
+                room (YRoom | None): The room to delete (if `name` is not passed).
+        """
+        await super().delete_room(name=name, room=room)
+        if self._garbage_collection is None:
+            self._garbage_collection = asyncio.get_running_loop().call_later(
+                GARBAGE_COLLECTION_DELAY, self._collect_garbage
+            )
+
+    async def delete_document_room(
+        self, room_id: str, room: YRoom, file_loaders: FileLoaderMapping
+    ) -> bool:
+        """
+        Deletes a document room, and the file loader of its document if no room uses it anymore.
+
+            Parameters:
+                room_id (str): The ID of the room.
+                room (YRoom): The room.
+                file_loaders (FileLoaderMapping): The file loaders of the documents.
+
+            Returns:
+                deleted (bool): Whether the file loader was deleted.
+        """
+        self.log.info("Deleting Y document from memory: %s", room_id)
+        await self.delete_room(room=room)
+
+        _, _, file_id = decode_file_path(room_id)
+        if file_id in file_loaders and file_loaders[file_id].number_of_subscriptions == 0:
+            self.log.info("Deleting file loader of %s", file_id)
+            await file_loaders.remove(file_id)
+            return True
+        return False
+
+    def _collect_garbage(self) -> None:
+        self._garbage_collection = None
+        gc.collect()
+
     def room_exists(self, path: str) -> bool:
         """
         Returns true is the room exist or false otherwise.
@@ -3,10 +3,14 @@
 
 from __future__ import annotations
 
+import asyncio
+import gc
+
 import nbformat
 import pytest
 from jupyter_server_ydoc.pytest_plugin import rtc_create_SQLite_store_factory
 from jupyter_server_ydoc.stores import SQLiteYStore, TempFileYStore
+from jupyter_server_ydoc.websocketserver import GARBAGE_COLLECTION_DELAY
 
 
 def test_default_settings(jp_serverapp):
@@ -175,3 +179,74 @@ async def test_get_document_file_copy_is_independent(
     )
     assert fresh_copy.get() == "test"
     await collaboration.stop_extension()
+
+
+async def test_prewarm_documents(rtc_create_file, jp_serverapp):
+    path, content = await rtc_create_file("test.txt", "test")
+    collaboration = jp_serverapp.web_app.settings["jupyter_server_ydoc"]
+
+    room_ids = await collaboration.prewarm([f"text:file:{path}", "text:file:missing.txt"])
+
+    fim = jp_serverapp.web_app.settings["file_id_manager"]
+    assert room_ids == [f"text:file:{fim.get_id(path)}"]
+    room = await collaboration.ywebsocket_server.get_room(room_ids[0])
+    assert room.ready
+    assert room._document.get() == content
+    await collaboration.stop_extension()
+
+
+async def test_prewarmed_rooms_without_clients_should_be_cleaned(rtc_create_file, jp_serverapp):
+    path, _ = await rtc_create_file("test.txt", "test")
+    collaboration = jp_serverapp.web_app.settings["jupyter_server_ydoc"]
+    collaboration.document_cleanup_delay = 0.1
+
+    room_ids = await collaboration.prewarm([f"text:file:{path}"])
+    room = await collaboration.ywebsocket_server.get_room(room_ids[0])
+    await asyncio.wait_for(room.cleaner, 1)
+
+    assert not collaboration.ywebsocket_server.room_exists(room_ids[0])
+    fim = jp_serverapp.web_app.settings["file_id_manager"]
+    assert fim.get_id(path) not in collaboration.file_loaders
+    await collaboration.stop_extension()
+
+
+async def test_prewarm_recent_documents(rtc_create_file, jp_serverapp):
+    await rtc_create_file("old.txt", "old", store=True)
+    await rtc_create_file("recent.txt", "recent", store=True)
+    collaboration = jp_serverapp.web_app.settings["jupyter_server_ydoc"]
+
+    room_ids = await collaboration._get_recent_room_ids(1)
+
+    fim = jp_serverapp.web_app.settings["file_id_manager"]
+    assert room_ids == [f"text:file:{fim.get_id('recent.txt')}"]
+    await collaboration.stop_extension()
+
+
+async def test_ystore_database_error_should_not_block_the_server_start(jp_serverapp, tmp_path):
+    collaboration = jp_serverapp.web_app.settings["jupyter_server_ydoc"]
+    # a directory cannot be opened as a database
+    ystore = SQLiteYStore(path="", db_path=str(tmp_path))
+
+    await asyncio.wait_for(collaboration._open_ystore_database(ystore), 5)
+
+    assert collaboration._ystore is not ystore
+    await collaboration.stop_extension()
+
+
+async def test_cleaned_rooms_should_not_be_dropped_by_other_threads(
+    rtc_create_notebook, jp_serverapp
+):
+    path, _ = await rtc_create_notebook("test.ipynb")
+    collaboration = jp_serverapp.web_app.settings["jupyter_server_ydoc"]
+    collaboration.document_cleanup_delay = 0.1
+    room_ids = await collaboration.prewarm([f"json:notebook:{path}"])
+    room = await collaboration.ywebsocket_server.get_room(room_ids[0])
+    cleaner = room.cleaner
+    del room
+    await asyncio.wait_for(cleaner, 1)
+    await asyncio.sleep(GARBAGE_COLLECTION_DELAY + 0.1)
+
+    # a garbage collection is run by the thread which triggers it, e.g. one running a
+    # contents manager call, where the pycrdt objects of the room cannot be dropped
+    await asyncio.to_thread(gc.collect)
+    await collaboration.stop_extension()
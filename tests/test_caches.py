@@ -0,0 +1,104 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+
+from jupyter_server_ydoc.caches import SourceUpdateCache
+
+
+def test_key_depends_on_document_type_and_hash():
+    key = SourceUpdateCache.key("json", "notebook", "hash")
+
+    assert key == SourceUpdateCache.key("json", "notebook", "hash")
+    assert key != SourceUpdateCache.key("text", "file", "hash")
+    assert key != SourceUpdateCache.key("json", "notebook", "other_hash")
+    assert key != SourceUpdateCache.key("json", "notebook", "hash", "md5")
+
+
+async def test_cache_counts_hits_and_misses():
+    cache = SourceUpdateCache(1024)
+
+    assert await cache.get("key") is None
+    await cache.set("key", b"update")
+    assert await cache.get("key") == b"update"
+
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+async def test_cache_evicts_least_recently_used_updates():
+    cache = SourceUpdateCache(10)
+
+    await cache.set("first", b"12345")
+    await cache.set("second", b"12345")
+    # Use the first update so that the second one is evicted
+    assert await cache.get("first") == b"12345"
+    await cache.set("third", b"12345")
+
+    assert await cache.get("second") is None
+    assert await cache.get("first") == b"12345"
+    assert await cache.get("third") == b"12345"
+    assert cache.size == 10
+    assert cache.evictions == 1
+
+
+async def test_cache_skips_updates_larger_than_its_size():
+    cache = SourceUpdateCache(4)
+
+    await cache.set("key", b"12345")
+
+    assert await cache.get("key") is None
+    assert cache.size == 0
+
+
+async def test_cache_persists_updates_on_disk(tmp_path):
+    cache = SourceUpdateCache(1024, cache_dir=str(tmp_path), max_disk_size=1024)
+    await cache.set("key", b"update")
+
+    # A new cache, e.g. after a server restart
+    cache = SourceUpdateCache(1024, cache_dir=str(tmp_path), max_disk_size=1024)
+
+    assert cache.disk_size == len(b"update")
+    assert await cache.get("key") == b"update"
+    assert cache.hits == 1
+
+
+async def test_cache_evicts_updates_from_disk(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = SourceUpdateCache(0, cache_dir=str(cache_dir), max_disk_size=10)
+
+    await cache.set("first", b"12345")
+    await cache.set("second", b"12345")
+    await cache.set("third", b"12345")
+
+    assert sorted(path.name for path in cache_dir.iterdir()) == ["second.y", "third.y"]
+    assert cache.disk_size == 10
+    assert await cache.get("first") is None
+    assert await cache.get("third") == b"12345"
+
+
+async def test_cache_reads_updates_evicted_from_disk_while_reading(tmp_path, monkeypatch):
+    cache = SourceUpdateCache(0, cache_dir=str(tmp_path), max_disk_size=10)
+    await cache.set("first", b"12345")
+    await cache.set("second", b"12345")
+    evicted = threading.Event()
+    utime = os.utime
+
+    def wait_for_eviction(path, *args, **kwargs):
+        # the update is read, and its file is removed when it is evicted
+        evicted.wait(1)
+        utime(tmp_path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "utime", wait_for_eviction)
+
+    reading = asyncio.create_task(cache.get("first"))
+    await asyncio.sleep(0.05)
+    await cache.set("third", b"12345")
+    evicted.set()
+
+    assert await reading == b"12345"
+    assert cache.disk_size == 10
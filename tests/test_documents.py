@@ -275,3 +275,84 @@ async def test_notebook_reconnect_sends_conflict_when_cell_structure_changes_bet
     finally:
         await room_b.stop()
         await loader_b.clean()
+
+
+async def test_notebook_outofband_change_should_only_update_the_changed_source():
+    notebook = _notebook_model()
+    notebook["cells"] = [
+        {
+            "cell_type": "code",
+            "id": f"cell-{i}",
+            "metadata": {},
+            "source": "\n".join(f"value_{i}_{line} = {line} * 2" for line in range(20)),
+            "outputs": [
+                {
+                    "output_type": "execute_result",
+                    "execution_count": i,
+                    "data": {"text/plain": "x" * 1000},
+                    "metadata": {},
+                }
+            ],
+            "execution_count": i,
+        }
+        for i in range(50)
+    ]
+    changed = deepcopy(notebook)
+    changed["cells"][10]["source"] = changed["cells"][10]["source"].replace(
+        "value_10_5 = 5 * 2", "value_10_5 = 5 * 3"
+    )
+    room, loader = await _create_notebook_room(notebook, "outofband")
+    overwritten = YNotebook()
+    overwritten.set(notebook)
+    updates: list[bytes] = []
+    full_updates: list[bytes] = []
+    room.ydoc.observe(lambda event: updates.append(event.update))
+    overwritten.ydoc.observe(lambda event: full_updates.append(event.update))
+
+    try:
+        loader._contents_manager.model["content"] = deepcopy(changed)
+        await room._on_outofband_change()
+
+        assert room._document.get()["cells"] == changed["cells"]
+        # replacing the source of the cell makes an update of its whole source
+        await overwritten.aset(deepcopy(changed))
+        assert overwritten.get()["cells"] == changed["cells"]
+        assert len(updates[0]) * 4 < len(full_updates[0])
+    finally:
+        await room.stop()
+        await loader.clean()
+
+
+async def test_notebook_outofband_change_of_large_cells_should_be_applied_quickly():
+    # cells reindented or edited in many places outside of the editor
+    lines = [f"    value_{line} = compute(x_{line}, y={line})  # {line}\n" for line in range(400)]
+    edited = list(lines)
+    for line in range(0, 400, 20):
+        edited[line] = edited[line].replace("compute", "evaluate")
+    notebook = _notebook_model()
+    notebook["cells"] = [
+        {
+            "cell_type": "code",
+            "id": f"cell-{i}",
+            "metadata": {},
+            "source": "".join(lines),
+            "outputs": [],
+            "execution_count": None,
+        }
+        for i in range(2)
+    ]
+    changed = deepcopy(notebook)
+    changed["cells"][0]["source"] = "".join(f"  {line}" for line in lines)
+    changed["cells"][1]["source"] = "".join(edited)
+    room, loader = await _create_notebook_room(notebook, "outofband")
+
+    try:
+        loader._contents_manager.model["content"] = deepcopy(changed)
+        start = time()
+        await room._on_outofband_change()
+
+        assert time() - start < 1
+        assert room._document.get()["cells"] == changed["cells"]
+    finally:
+        await room.stop()
+        await loader.clean()
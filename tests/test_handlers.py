@@ -10,8 +10,9 @@ from typing import Any
 import pytest
 from dirty_equals import IsStr
 from jupyter_events.logger import EventLogger
+from jupyter_server_ydoc.utils import MessageType
 from jupyter_ydoc import YUnicode
-from pycrdt import Provider, Text
+from pycrdt import Decoder, Encoder, Provider, Text
 from pycrdt.websocket.websocket import HttpxWebsocket
 
 
@@ -88,6 +89,29 @@ async def test_room_handler_doc_client_should_connect(rtc_create_file, rtc_conne
     assert doc.source == content
 
 
+async def test_room_handler_doc_client_should_reply_success_to_saves_without_changes(
+    rtc_create_file, rtc_connect_doc_client
+):
+    path, _ = await rtc_create_file("test.txt", "test")
+
+    websocket, _ = await rtc_connect_doc_client("text", "file", path)
+    async with websocket as ws:
+        # the second save finds the document unchanged since the first one
+        for save_id in (1, 2):
+            encoder = Encoder()
+            encoder.write_var_uint(MessageType.RAW)
+            encoder.write_var_string("save")
+            encoder.write_var_uint(save_id)
+            await ws.send_bytes(encoder.to_bytes())
+
+            while True:
+                message = await ws.receive_bytes()
+                if message[0] == MessageType.RAW:
+                    break
+            reply = json.loads(Decoder(message[1:]).read_var_string())
+            assert reply == {"type": "save", "responseTo": save_id, "status": "success"}
+
+
 async def test_room_handler_doc_client_should_emit_awareness_event(
     rtc_create_file, rtc_connect_doc_client, jp_serverapp
 ):
@@ -134,6 +158,42 @@ async def test_room_handler_doc_client_should_emit_awareness_event(
     assert collected_data[1]["username"] is not None
 
 
+async def test_room_handler_doc_client_should_emit_timings(
+    rtc_create_file, rtc_connect_doc_client, jp_serverapp
+):
+    path, _ = await rtc_create_file("test.txt", "test")
+
+    event = Event()
+
+    def _on_document_change(target: str, e: Any) -> None:
+        if target == "source":
+            event.set()
+
+    doc = YUnicode()
+    doc.observe(_on_document_change)
+
+    collected_data = []
+
+    async def my_listener(logger: EventLogger, schema_id: str, data: dict) -> None:
+        collected_data.append(data)
+
+    jp_serverapp.event_logger.add_listener(
+        schema_id="https://schema.jupyter.org/jupyter_collaboration/session/v1",
+        listener=my_listener,
+    )
+
+    websocket, room_name = await rtc_connect_doc_client("text", "file", path)
+    async with websocket as ws, Provider(doc.ydoc, HttpxWebsocket(ws, room_name)):
+        await event.wait()
+        await sleep(0.1)
+
+    timings = {data["msg"]: data["timings"] for data in collected_data if "timings" in data}
+    assert "contents_get" in timings["Room initialized"]
+    assert "room_initialize" in timings["New client connected."]
+    first_sync = timings["Document synchronized with the client."]["first_sync"]
+    assert first_sync >= timings["New client connected."]["room_initialize"]
+
+
 @pytest.fixture
 def rtc_document_cleanup_delay():
     return 2
@@ -177,10 +237,8 @@ async def test_room_handler_doc_client_should_stop_file_watcher(
         listener=my_listener,
     )
 
-    file_watcher = file_loader._watcher
-
-    # Before cleanup delay, the file watcher should still be running
-    assert not file_watcher.done()
+    # Before cleanup delay, the file should still be watched
+    assert file_loaders._polled[file_id] is file_loader
 
     # Wait for the cleanup delay (2 seconds) plus a buffer (0.5 seconds)
     await sleep(2.5)
@@ -192,8 +250,9 @@ async def test_room_handler_doc_client_should_stop_file_watcher(
     assert collected_data[1]["msg"] == "Loader deleted."
     assert collected_data[1]["path"] == "test.txt"
 
-    # After the cleanup delay, the file watcher should be done
-    assert file_watcher.done()
+    # After the cleanup delay, the file shouldn't be watched anymore
+    assert file_id not in file_loaders._polled
+    assert file_loaders._poller is None
 
     await jp_serverapp.web_app.settings["jupyter_server_ydoc"].stop_extension()
     del jp_serverapp.web_app.settings["file_id_manager"]
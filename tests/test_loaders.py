@@ -4,11 +4,19 @@
 from __future__ import annotations
 
 import asyncio
+import gc
 import logging
+import os
+import time
 from datetime import datetime, timedelta, timezone
 
+import nbformat
+import pytest
+from jupyter_server.services.contents.filemanager import AsyncFileContentsManager
+from jupyter_server_ydoc import loaders
 from jupyter_server_ydoc.loaders import FileLoader, FileLoaderMapping
 from jupyter_server_ydoc.test_utils import FakeContentsManager, FakeFileIDManager
+from tornado.web import HTTPError
 
 
 async def test_FileLoader_with_watcher():
@@ -35,6 +43,7 @@ async def test_FileLoader_with_watcher():
     loader.observe("test", trigger)
 
     cm.model["last_modified"] = datetime.now(timezone.utc) + timedelta(seconds=1)
+    cm.model["hash"] = "changed_hash"
 
     await asyncio.sleep(0.15)
 
@@ -127,6 +136,7 @@ async def test_FileLoader_without_watcher():
     loader.observe("test", trigger)
 
     cm.model["last_modified"] = datetime.now(timezone.utc) + timedelta(seconds=1)
+    cm.model["hash"] = "changed_hash"
 
     await loader.maybe_notify()
 
@@ -136,6 +146,36 @@ async def test_FileLoader_without_watcher():
         await loader.clean()
 
 
+async def test_FileLoader_ignores_modifications_without_content_changes():
+    cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc), "writable": True})
+    loader = FileLoader("file-4567", FakeFileIDManager({"file-4567": "myfile.txt"}), cm)
+    await loader.load_content("text", "file")
+    triggered = False
+
+    async def trigger():
+        nonlocal triggered
+        triggered = True
+
+    loader.observe("test", trigger)
+
+    try:
+        # the file is touched
+        cm.model["last_modified"] = datetime.now(timezone.utc) + timedelta(seconds=1)
+        await loader.maybe_notify()
+
+        assert not triggered
+        assert loader.unchanged_modifications == 1
+        assert loader.last_modified == cm.model["last_modified"]
+
+        # the file is saved without raising out-of-band changes
+        cm.model["last_modified"] = datetime.now(timezone.utc) + timedelta(seconds=2)
+        cm.actions.clear()
+        await loader.maybe_save_content({"format": "text", "type": "file", "content": "test"})
+        assert "save" in cm.actions
+    finally:
+        await loader.clean()
+
+
 async def test_FileLoaderMapping_with_watcher():
     id = "file-4567"
     path = "myfile.txt"
@@ -167,3 +207,468 @@ async def test_FileLoaderMapping_with_watcher():
     await asyncio.sleep(0.15)
 
     assert not triggered
+
+
+class SlowContentsManager(FakeContentsManager):
+    def get(self, *args, **kwargs) -> dict:
+        time.sleep(0.05)
+        return super().get(*args, **kwargs)
+
+
+async def test_FileLoaderMapping_runs_sync_contents_manager_in_threads():
+    paths = {f"file-{i}": f"file-{i}.txt" for i in range(4)}
+    cm = SlowContentsManager({"last_modified": datetime.now(timezone.utc)})
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager(paths)},
+        contents_manager_threads=2,
+    )
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    try:
+        start = time.monotonic()
+        await asyncio.gather(*(map[id].load_content("text", "file") for id in paths))
+        duration = time.monotonic() - start
+
+        # the calls ran two at a time, without blocking the event loop
+        assert duration < 0.15
+        assert ticks >= 10
+        assert map.thread_pool is not None
+        assert map.thread_pool.metrics["calls"] == 4
+        assert map.thread_pool.metrics["max_wait_time"] >= 0.04
+    finally:
+        ticker.cancel()
+        await map.clear()
+
+
+class SlowBackendContentsManager(FakeContentsManager):
+    """A contents manager whose saves and metadata requests of the polls are slow."""
+
+    def __init__(self, model: dict, poll_delay: float = 0, save_delay: float = 0):
+        super().__init__(model)
+        self.poll_delay = poll_delay
+        self.save_delay = save_delay
+
+    async def get(self, path, content=True, format=None, type=None, require_hash=None) -> dict:
+        if type is None and not require_hash:
+            await asyncio.sleep(self.poll_delay)
+        return super().get(path, content, format, type, require_hash)
+
+    async def save(self, model, path) -> dict:
+        await asyncio.sleep(self.save_delay)
+        self.model["last_modified"] += timedelta(seconds=1)
+        return super().save(model, path)
+
+
+async def test_FileLoader_polls_should_not_wait_for_slow_saves():
+    cm = SlowBackendContentsManager(
+        {"last_modified": datetime.now(timezone.utc), "writable": True}, save_delay=0.2
+    )
+    loader = FileLoader("file-4567", FakeFileIDManager({"file-4567": "myfile.txt"}), cm)
+    await loader.load_content("text", "file")
+    triggered = False
+
+    async def trigger():
+        nonlocal triggered
+        triggered = True
+
+    loader.observe("test", trigger)
+
+    try:
+        saving = asyncio.create_task(
+            loader.maybe_save_content({"format": "text", "type": "file", "content": "test"})
+        )
+        await asyncio.sleep(0.01)
+
+        start = time.monotonic()
+        await loader.maybe_notify()
+        assert time.monotonic() - start < 0.05
+        assert loader.skipped_polls == 1
+
+        await saving
+        await loader.maybe_notify()
+        # the save didn't look like an out-of-band change
+        assert not triggered
+    finally:
+        await loader.clean()
+
+
+async def test_FileLoader_saves_should_not_wait_for_slow_polls():
+    cm = SlowBackendContentsManager(
+        {"last_modified": datetime.now(timezone.utc), "writable": True}, poll_delay=0.2
+    )
+    loader = FileLoader("file-4567", FakeFileIDManager({"file-4567": "myfile.txt"}), cm)
+    await loader.load_content("text", "file")
+    triggered = False
+
+    async def trigger():
+        nonlocal triggered
+        triggered = True
+
+    loader.observe("test", trigger)
+
+    try:
+        polling = asyncio.create_task(loader.maybe_notify())
+        await asyncio.sleep(0.01)
+
+        start = time.monotonic()
+        await loader.maybe_save_content({"format": "text", "type": "file", "content": "test"})
+        assert time.monotonic() - start < 0.05
+
+        # the result of the poll, which raced the save, is discarded
+        await polling
+        assert loader.skipped_polls == 1
+        assert not triggered
+    finally:
+        await loader.clean()
+
+
+def count_contents_manager_calls(cm: AsyncFileContentsManager) -> list[str]:
+    """Records the calls to the contents manager, not counting the calls made by `save`."""
+    actions: list[str] = []
+    get, save = cm.get, cm.save
+    saving = False
+
+    async def counting_get(*args, **kwargs):
+        if not saving:
+            actions.append("get")
+        return await get(*args, **kwargs)
+
+    async def counting_save(*args, **kwargs):
+        nonlocal saving
+        actions.append("save")
+        saving = True
+        try:
+            return await save(*args, **kwargs)
+        finally:
+            saving = False
+
+    cm.get = counting_get
+    cm.save = counting_save
+    return actions
+
+
+@pytest.mark.parametrize(
+    "file_type, file_format, path, content",
+    [
+        ("file", "text", "test.txt", "test\n"),
+        ("notebook", "json", "test.ipynb", nbformat.v4.new_notebook()),
+    ],
+)
+async def test_FileLoader_saves_with_two_contents_manager_calls(
+    tmp_path, file_type, file_format, path, content
+):
+    # the notebook validation in the threads of the contents manager triggers garbage
+    # collections, which cannot drop the pycrdt objects left by the clients of other tests
+    gc.collect()
+    root_dir = tmp_path / "files"
+    root_dir.mkdir()
+    cm = AsyncFileContentsManager(root_dir=str(root_dir))
+    await cm.save({"type": file_type, "format": file_format, "content": content}, path)
+    loader = FileLoader("file-4567", FakeFileIDManager({"file-4567": path}), cm)
+    model = await loader.load_content(file_format, file_type)
+
+    actions = count_contents_manager_calls(cm)
+    saved_model = await loader.maybe_save_content(
+        {"format": file_format, "type": file_type, "content": model["content"]}
+    )
+
+    # the previous implementation needed a third call to get the hash
+    assert actions == ["get", "save"]
+    expected = await cm.get(path, content=False, require_hash=True)
+    assert saved_model["hash"] == expected["hash"]
+    await loader.clean()
+
+
+async def test_FileLoader_gets_hash_from_other_contents_managers():
+    cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc), "writable": True})
+    loader = FileLoader("file-4567", FakeFileIDManager({"file-4567": "myfile.txt"}), cm)
+    await loader.load_content("text", "file")
+
+    cm.actions.clear()
+    saved_model = await loader.maybe_save_content(
+        {"format": "text", "type": "file", "content": "test"}
+    )
+
+    assert cm.actions == ["get", "save", "get"]
+    assert saved_model["hash"] == "fake_hash"
+    await loader.clean()
+
+
+async def test_FileLoaderMapping_polls_local_files_without_contents_manager(tmp_path):
+    root_dir = tmp_path / "files"
+    root_dir.mkdir()
+    cm = AsyncFileContentsManager(root_dir=str(root_dir))
+    paths = {f"file-{i}": f"file-{i}.txt" for i in range(3)}
+    for path in paths.values():
+        await cm.save({"type": "file", "format": "text", "content": "test"}, path)
+
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager(paths)},
+        file_poll_interval=0.05,
+    )
+    triggered = []
+    for id in paths:
+        loader = map[id]
+        await loader.load_content("text", "file")
+
+        async def trigger(id=id):
+            triggered.append(id)
+
+        loader.observe("test", trigger)
+
+    try:
+        actions = count_contents_manager_calls(cm)
+        await asyncio.sleep(0.2)
+
+        # unchanged files are only stat'ed
+        assert actions == []
+        assert map.metrics["poll_cycles"] >= 2
+        assert map.metrics["polled_files"] == 3
+
+        os_path = root_dir / "file-1.txt"
+        os_path.write_text("changed")
+        mtime = os_path.stat().st_mtime + 1
+        os.utime(os_path, (mtime, mtime))
+        await asyncio.sleep(0.15)
+
+        assert triggered == ["file-1"]
+        assert actions == ["get"]
+        assert map.metrics["checked_files"] == 1
+    finally:
+        await map.clear()
+
+
+async def test_FileLoaderMapping_ignores_touched_local_files(tmp_path):
+    root_dir = tmp_path / "files"
+    root_dir.mkdir()
+    cm = AsyncFileContentsManager(root_dir=str(root_dir))
+    await cm.save({"type": "file", "format": "text", "content": "test"}, "test.txt")
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager({"file-1": "test.txt"})},
+        file_poll_interval=0.05,
+    )
+    loader = map["file-1"]
+    await loader.load_content("text", "file")
+    triggered = []
+
+    async def trigger():
+        triggered.append(loader.file_id)
+
+    loader.observe("test", trigger)
+
+    try:
+        actions = count_contents_manager_calls(cm)
+        os_path = root_dir / "test.txt"
+        mtime = os_path.stat().st_mtime + 1
+        os.utime(os_path, (mtime, mtime))
+        await asyncio.sleep(0.15)
+
+        # the content is hashed locally, and not reloaded
+        assert triggered == []
+        assert actions == ["get"]
+        assert loader.unchanged_modifications == 1
+        assert map.metrics["checked_files"] == 1
+    finally:
+        await map.clear()
+
+
+async def test_FileLoaderMapping_reloads_touched_local_files_above_hash_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(loaders, "MAX_LOCAL_HASH_SIZE", 2)
+    root_dir = tmp_path / "files"
+    root_dir.mkdir()
+    cm = AsyncFileContentsManager(root_dir=str(root_dir))
+    await cm.save({"type": "file", "format": "text", "content": "test"}, "test.txt")
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager({"file-1": "test.txt"})},
+        file_poll_interval=0.05,
+    )
+    loader = map["file-1"]
+    await loader.load_content("text", "file")
+    triggered = []
+
+    async def trigger():
+        triggered.append(loader.file_id)
+
+    loader.observe("test", trigger)
+
+    try:
+        os_path = root_dir / "test.txt"
+        mtime = os_path.stat().st_mtime + 1
+        os.utime(os_path, (mtime, mtime))
+        await asyncio.sleep(0.15)
+
+        # the file is not hashed, and considered changed
+        assert triggered == ["file-1"]
+        assert loader.unchanged_modifications == 0
+    finally:
+        await map.clear()
+
+
+async def test_FileLoaderMapping_polls_all_files_of_other_contents_managers():
+    paths = {"file-1": "file-1.txt", "file-2": "file-2.txt"}
+    cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc)})
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager(paths)},
+        file_poll_interval=0.05,
+    )
+    triggered = []
+    for id in paths:
+        loader = map[id]
+        await loader.load_content("text", "file")
+
+        async def trigger(id=id):
+            triggered.append(id)
+
+        loader.observe("test", trigger)
+
+    try:
+        cm.model["last_modified"] = datetime.now(timezone.utc) + timedelta(seconds=1)
+        cm.model["hash"] = "changed_hash"
+        await asyncio.sleep(0.08)
+
+        assert sorted(triggered) == ["file-1", "file-2"]
+        assert map.metrics["poll_cycles"] == 1
+        assert map.metrics["checked_files"] == 2
+        assert map.metrics["last_poll_duration"] > 0
+    finally:
+        await map.clear()
+    assert map._poller is None
+
+
+async def test_FileLoaderMapping_backs_off_polling_of_idle_files():
+    paths = {f"file-{i}": f"file-{i}.txt" for i in range(10)}
+    maps = []
+    for file_poll_max_interval in (None, 0.16):
+        cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc)})
+        map = FileLoaderMapping(
+            {"contents_manager": cm, "file_id_manager": FakeFileIDManager(paths)},
+            file_poll_interval=0.01,
+            file_poll_max_interval=file_poll_max_interval,
+        )
+        for id in paths:
+            await map[id].load_content("text", "file")
+        maps.append(map)
+
+    try:
+        await asyncio.sleep(0.5)
+        fixed_checks = maps[0].metrics["checked_files"]
+        backoff_checks = maps[1].metrics["checked_files"]
+        assert backoff_checks * 5 < fixed_checks
+    finally:
+        for map in maps:
+            await map.clear()
+
+
+async def test_FileLoaderMapping_resets_poll_interval_of_active_files():
+    cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc)})
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager({"file-1": "file-1.txt"})},
+        file_poll_interval=0.01,
+        file_poll_max_interval=10,
+    )
+    loader = map["file-1"]
+    await loader.load_content("text", "file")
+    triggered = asyncio.Event()
+
+    async def trigger():
+        triggered.set()
+
+    loader.observe("test", trigger)
+
+    try:
+        await asyncio.sleep(0.2)
+        assert loader.idle_polls >= 3
+
+        # a client connects
+        loader.mark_active()
+        cm.model["last_modified"] = datetime.now(timezone.utc) + timedelta(seconds=1)
+        cm.model["hash"] = "changed_hash"
+        await asyncio.wait_for(triggered.wait(), 0.1)
+        assert loader.idle_polls <= 1
+    finally:
+        await map.clear()
+
+
+class CountingFileIDManager(FakeFileIDManager):
+    def __init__(self, mapping: dict):
+        super().__init__(mapping)
+        self.queries = 0
+
+    def get_path(self, id: str) -> str:
+        self.queries += 1
+        return super().get_path(id)
+
+
+@pytest.mark.parametrize("path_cache_ttl, expected_queries", [(None, 3), (60, 0)])
+async def test_FileLoader_caches_its_path(path_cache_ttl, expected_queries):
+    cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc), "writable": True})
+    fim = CountingFileIDManager({"file-4567": "myfile.txt"})
+    loader = FileLoader("file-4567", fim, cm, path_cache_ttl=path_cache_ttl)
+    await loader.load_content("text", "file")
+
+    fim.queries = 0
+    await loader.maybe_save_content({"format": "text", "type": "file", "content": "test"})
+    # the previous implementation queried the path for each contents manager call
+    assert fim.queries == expected_queries
+
+    fim.queries = 0
+    await loader.maybe_notify()
+    assert fim.queries == min(expected_queries, 1)
+    await loader.clean()
+
+
+async def test_FileLoader_detects_move_of_cached_path():
+    cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc)})
+    fim = FakeFileIDManager({"file-4567": "myfile.txt"})
+    loader = FileLoader("file-4567", fim, cm, path_cache_ttl=60)
+    await loader.load_content("text", "file")
+    moved = asyncio.Event()
+
+    async def trigger():
+        pass
+
+    def on_move():
+        moved.set()
+
+    loader.observe("test", trigger, on_move)
+    fim.move("file-4567", "moved.txt")
+    # the path is cached
+    assert loader.path == "myfile.txt"
+
+    get = cm.get
+
+    def get_moved(path, **kwargs):
+        if path != "moved.txt":
+            raise HTTPError(404, f"File not found: {path}")
+        return get(path, **kwargs)
+
+    cm.get = get_moved
+    await loader.maybe_notify()
+
+    assert moved.is_set()
+    assert loader.path == "moved.txt"
+    await loader.clean()
+
+
+async def test_FileLoaderMapping_invalidates_cached_paths():
+    cm = FakeContentsManager({"last_modified": datetime.now(timezone.utc)})
+    fim = FakeFileIDManager({"file-4567": "myfile.txt"})
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": fim},
+        file_path_cache_ttl=60,
+    )
+    loader = map["file-4567"]
+    assert map.get_path("file-4567") == "myfile.txt"
+
+    fim.move("file-4567", "moved.txt")
+    assert loader.path == "myfile.txt"
+    map.invalidate_paths()
+    assert map.get_path("file-4567") == "moved.txt"
+    await map.clear()
@@ -4,10 +4,17 @@
 from __future__ import annotations
 
 import asyncio
+import threading
+import time
 from unittest.mock import AsyncMock, patch
 
+from jupyter_server_ydoc.caches import SourceUpdateCache
+from jupyter_server_ydoc.rooms import build_source_update, read_document_content
+from jupyter_server_ydoc.schedulers import SaveScheduler
+from jupyter_server_ydoc.stores import SQLiteYStore
 from jupyter_server_ydoc.utils import OutOfBandChanges
 from jupyter_ydoc import YUnicode
+from pycrdt import Awareness, Doc
 
 
 async def test_should_initialize_document_room_without_store(rtc_create_mock_document_room):
@@ -34,6 +41,38 @@ async def test_should_initialize_document_room_from_store(
     assert room._document.source == content
 
 
+async def test_should_load_content_and_store_concurrently(
+    rtc_create_SQLite_store, rtc_create_mock_document_room
+):
+    delay = 0.3
+    content = "test"
+    store = await rtc_create_SQLite_store("file", "test-id", content)
+    cm, _, room = rtc_create_mock_document_room("test-id", "test.txt", content, store=store)
+
+    get_model = cm.get
+    apply_updates = store.apply_updates
+
+    async def slow_get(*args, **kwargs):
+        await asyncio.sleep(delay)
+        return get_model(*args, **kwargs)
+
+    async def slow_apply_updates(ydoc):
+        await asyncio.sleep(delay)
+        await apply_updates(ydoc)
+
+    with (
+        patch.object(cm, "get", slow_get),
+        patch.object(store, "apply_updates", slow_apply_updates),
+    ):
+        start = time.monotonic()
+        await room.initialize()
+        elapsed = time.monotonic() - start
+
+    assert room._document.source == content
+    # Loading sequentially would take at least twice the delay
+    assert elapsed < 2 * delay
+
+
 async def test_should_overwrite_the_store(rtc_create_SQLite_store, rtc_create_mock_document_room):
     id = "test-id"
     content = "test"
@@ -325,3 +364,396 @@ async def test_save_oob_calls_aset_when_content_changed(
         mock_aset.assert_called_once_with("changed on disk")
 
     assert not room._document.dirty
+
+
+async def test_should_skip_comparison_when_fingerprint_matches(
+    jp_serverapp, rtc_create_mock_document_room
+):
+    content = "test"
+    store = SQLiteYStore(path="file:test-id", config=jp_serverapp.config)
+    cm, _, room = rtc_create_mock_document_room("test-id", "test.txt", content, store=store)
+    # Start the room so that it writes the document updates to the store
+    asyncio.create_task(room.start())
+    await room.started.wait()
+    await room.initialize()
+    await room.ydoc_observed.wait()
+
+    room._document.source = "Test 2"
+    await room._maybe_save_document(None, save_now=True)
+    cm.model["content"] = "Test 2"
+    await asyncio.sleep(0.1)
+    await room.stop()
+
+    store = SQLiteYStore(path="file:test-id", config=jp_serverapp.config)
+    _, _, reloaded_room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "Test 2", store=store
+    )
+    with patch.object(reloaded_room._document, "aget", new_callable=AsyncMock) as mock_aget:
+        await reloaded_room.initialize()
+        mock_aget.assert_not_called()
+
+    assert reloaded_room._document.source == "Test 2"
+
+
+async def test_should_skip_comparison_when_fingerprint_matches_after_reload_and_save(
+    jp_serverapp, rtc_create_mock_document_room
+):
+    content = "test"
+    for source in ("Test 2", "Test 3", "Test 4"):
+        store = SQLiteYStore(path="file:test-id", config=jp_serverapp.config)
+        _, _, room = rtc_create_mock_document_room("test-id", "test.txt", content, store=store)
+        asyncio.create_task(room.start())
+        await room.started.wait()
+        with patch.object(room._document, "aget", wraps=room._document.aget) as mock_aget:
+            await room.initialize()
+            # the document matches the fingerprint of the last save
+            mock_aget.assert_not_called()
+        await room.ydoc_observed.wait()
+
+        # the document is saved after it is reloaded
+        room._document.source = content = source
+        await room._maybe_save_document(None, save_now=True)
+        await asyncio.sleep(0.1)
+        await room.stop()
+
+
+async def test_should_compare_content_when_fingerprint_does_not_match(
+    jp_serverapp, rtc_create_mock_document_room
+):
+    content = "test"
+    store = SQLiteYStore(path="file:test-id", config=jp_serverapp.config)
+    _, _, room = rtc_create_mock_document_room("test-id", "test.txt", content, store=store)
+    await room.initialize()
+
+    store = SQLiteYStore(path="file:test-id", config=jp_serverapp.config)
+    cm, _, reloaded_room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "changed on disk", store=store
+    )
+    cm.model["hash"] = "other_hash"
+
+    await reloaded_room.initialize()
+
+    assert reloaded_room._document.source == "changed on disk"
+
+
+async def test_should_apply_cached_source_update(rtc_create_mock_document_room):
+    content = "test"
+    cache = SourceUpdateCache(1024 * 1024)
+    _, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", content, source_update_cache=cache
+    )
+    await room.initialize()
+
+    assert cache.misses == 1
+
+    _, _, reloaded_room = rtc_create_mock_document_room(
+        "test-id", "test.txt", content, source_update_cache=cache
+    )
+    with patch.object(YUnicode, "aset", new_callable=AsyncMock) as mock_aset:
+        await reloaded_room.initialize()
+        mock_aset.assert_not_called()
+
+    assert cache.hits == 1
+    assert reloaded_room._document.source == content
+
+
+async def test_should_build_large_document_in_worker_thread(rtc_create_mock_document_room):
+    content = "test"
+    cm, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", content, document_build_offload_threshold_mb=0
+    )
+    cm.model["size"] = len(content)
+
+    threads = []
+
+    def build(file_type, content):
+        threads.append(threading.get_ident())
+        return build_source_update(file_type, content)
+
+    with patch("jupyter_server_ydoc.rooms.build_source_update", build):
+        await room.initialize()
+
+    assert len(threads) == 1
+    assert threads[0] != threading.get_ident()
+    assert room._document.source == content
+
+
+async def test_should_build_small_document_on_event_loop(rtc_create_mock_document_room):
+    content = "test"
+    cm, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", content, document_build_offload_threshold_mb=1
+    )
+    cm.model["size"] = len(content)
+
+    with patch("jupyter_server_ydoc.rooms.build_source_update") as mock_build:
+        await room.initialize()
+        mock_build.assert_not_called()
+
+    assert room._document.source == content
+
+
+async def test_should_build_identical_updates_in_worker_thread_and_on_event_loop(
+    rtc_create_mock_document_room,
+):
+    content = "test"
+    updates = []
+    for threshold in (0, 1):
+        cache = SourceUpdateCache(1024 * 1024)
+        cm, _, room = rtc_create_mock_document_room(
+            "test-id",
+            "test.txt",
+            content,
+            source_update_cache=cache,
+            document_build_offload_threshold_mb=threshold,
+        )
+        cm.model["size"] = len(content)
+        await room.initialize()
+        updates.extend(cache._entries.values())
+
+    assert len(updates) == 2
+    assert updates[0] == updates[1]
+
+
+async def test_should_emit_initialization_timings(
+    rtc_create_SQLite_store, rtc_create_mock_document_room
+):
+    content = "test"
+    store = await rtc_create_SQLite_store("file", "test-id", "other")
+    _, _, room = rtc_create_mock_document_room("test-id", "test.txt", content, store=store)
+
+    with patch.object(room._logger, "emit") as mock_emit:
+        await room.initialize()
+
+    initialized = [
+        call.kwargs["data"]
+        for call in mock_emit.call_args_list
+        if call.kwargs["data"].get("msg") == "Room initialized"
+    ]
+    assert len(initialized) == 1
+    timings = initialized[0]["timings"]
+    assert set(timings) == {
+        "contents_get",
+        "ystore_start",
+        "ystore_apply_updates",
+        "sync_check",
+        "source_build",
+        "ystore_write",
+        "total",
+    }
+    assert all(duration >= 0 for duration in timings.values())
+    assert timings["total"] >= timings["source_build"]
+    assert room.timings == timings
+
+
+async def test_autosave_should_save_continuously_edited_document_after_max_wait(
+    rtc_create_mock_document_room,
+):
+    cm, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "test", save_delay=0.2, save_max_wait=0.3
+    )
+    await room.initialize()
+
+    # keep editing faster than the save delay
+    for i in range(12):
+        room._document.source = f"Test {i}"
+        await asyncio.sleep(0.05)
+
+    assert cm.actions.count("save") >= 1
+
+
+async def test_autosave_should_respect_min_interval(rtc_create_mock_document_room):
+    cm, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "test", save_delay=0.01, save_min_interval=0.5
+    )
+    await room.initialize()
+
+    room._document.source = "Test 1"
+    await asyncio.sleep(0.1)
+    assert cm.actions.count("save") == 1
+
+    room._document.source = "Test 2"
+    await asyncio.sleep(0.1)
+    assert cm.actions.count("save") == 1
+
+    await asyncio.sleep(0.5)
+    assert cm.actions.count("save") == 2
+
+
+async def test_autosave_delay_should_scale_with_save_cost_and_size(
+    rtc_create_mock_document_room,
+):
+    _, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "test", save_delay=1, save_cost_factor=5, save_delay_per_mb=0.5
+    )
+
+    assert room._get_save_delay() == 1
+
+    room._last_save_size = 4 * 1024 * 1024
+    assert room._get_save_delay() == 3
+
+    room._last_save_duration = 1
+    assert room._get_save_delay() == 5
+
+
+async def test_document_changes_should_share_a_single_save_timer(rtc_create_mock_document_room):
+    cm, _, room = rtc_create_mock_document_room("test-id", "test.txt", "test", save_delay=0.1)
+    await room.initialize()
+    number_of_tasks = len(asyncio.all_tasks())
+
+    start = time.perf_counter()
+    for i in range(1000):
+        room._on_document_change("source", None)
+    overhead = (time.perf_counter() - start) / 1000
+
+    # no task is created or cancelled per change
+    assert len(asyncio.all_tasks()) == number_of_tasks
+    assert room._saving_document is None
+    print(f"Overhead per change: {overhead * 1e6:.1f}us")
+
+    await asyncio.sleep(0.2)
+    assert cm.actions.count("save") == 1
+
+
+async def test_autosave_should_follow_awareness_changes_of_many_clients(
+    rtc_create_mock_document_room,
+):
+    cm, _, room = rtc_create_mock_document_room("test-id", "test.txt", "test", save_delay=0.01)
+    for client_id in range(200):
+        room.awareness._states[client_id] = {"autosave": False}
+    await room.initialize()
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        room._on_document_change("source", None)
+    print(f"Overhead per change with 200 clients: {(time.perf_counter() - start) * 1e3:.1f}us")
+    await asyncio.sleep(0.05)
+    assert "save" not in cm.actions
+
+    # a client connects with autosave enabled
+    client = Awareness(Doc())
+    client.set_local_state({"autosave": True})
+    room.awareness.apply_awareness_update(
+        client.encode_awareness_update([client.client_id]), "test"
+    )
+    room._document.source = "Test 2"
+    await asyncio.sleep(0.05)
+    assert cm.actions.count("save") == 1
+
+    # and disconnects
+    room.awareness.remove_awareness_states([client.client_id], "test")
+    room._document.source = "Test 3"
+    await asyncio.sleep(0.05)
+    assert cm.actions.count("save") == 1
+
+
+async def test_should_save_through_the_save_scheduler(rtc_create_mock_document_room):
+    scheduler = SaveScheduler(1)
+    cm, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "test", save_delay=0.01, save_scheduler=scheduler
+    )
+    await room.initialize()
+
+    room._document.source = "Test 2"
+    await asyncio.sleep(0.1)
+
+    assert cm.actions.count("save") == 1
+    assert scheduler.saves == 1
+    assert not room._document.dirty
+
+
+async def test_should_skip_save_when_document_is_unchanged(rtc_create_mock_document_room):
+    cm, _, room = rtc_create_mock_document_room("test-id", "test.txt", "test", save_delay=None)
+    await room.initialize()
+
+    room._document.source = "Test 2"
+    assert await room._save_to_disc() is None
+    assert cm.actions.count("save") == 1
+
+    # a manual save following a save doesn't write the file again
+    assert await room._save_to_disc() == "skipped"
+    assert cm.actions.count("save") == 1
+
+
+async def test_should_read_large_document_in_a_thread_when_saving(rtc_create_mock_document_room):
+    cm, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "test", document_save_offload_threshold_mb=0
+    )
+    await room.initialize()
+    room._document.source = "Test 2"
+
+    threads = []
+
+    def read(file_type, update):
+        threads.append(threading.get_ident())
+        return read_document_content(file_type, update)
+
+    with (
+        patch("jupyter_server_ydoc.rooms.read_document_content", read),
+        patch.object(cm, "save", wraps=cm.save) as mock_save,
+    ):
+        await room._save_to_disc()
+
+    assert len(threads) == 1
+    assert threads[0] != threading.get_ident()
+    assert mock_save.call_args.args[0]["content"] == "Test 2"
+    assert not room._document.dirty
+
+
+def track_slow_saves(room, duration: float):
+    writes = []
+    in_flight = 0
+    max_in_flight = 0
+
+    async def save(model):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(duration)
+        writes.append(model["content"])
+        in_flight -= 1
+        return {"hash": "fake_hash", "size": 0}
+
+    room._file.maybe_save_content = save
+    return writes, lambda: max_in_flight
+
+
+async def test_saves_requested_while_saving_should_be_queued_once(rtc_create_mock_document_room):
+    _, _, room = rtc_create_mock_document_room("test-id", "test.txt", "test", save_delay=None)
+    await room.initialize()
+    writes, max_in_flight = track_slow_saves(room, 0.05)
+
+    room._document.source = "v1"
+    first_save = room._save_to_disc()
+    await asyncio.sleep(0.01)
+
+    follow_ups = []
+    for version in ("v2", "v3", "v4"):
+        room._document.source = version
+        follow_ups.append(room._save_to_disc())
+
+    await asyncio.gather(first_save, *follow_ups)
+
+    # the save in flight isn't cancelled, a single follow-up saves the latest state
+    assert len(set(follow_ups)) == 1
+    assert writes == ["v1", "v4"]
+    assert max_in_flight() == 1
+
+
+async def test_continuous_edits_should_not_overlap_saves(rtc_create_mock_document_room):
+    _, _, room = rtc_create_mock_document_room(
+        "test-id", "test.txt", "test", save_delay=0.01, save_max_wait=0.02
+    )
+    await room.initialize()
+    writes, max_in_flight = track_slow_saves(room, 0.05)
+
+    start = time.monotonic()
+    for i in range(50):
+        room._document.source = f"v{i}"
+        await asyncio.sleep(0.005)
+    edit_time = time.monotonic() - start
+    await asyncio.sleep(0.2)
+
+    assert max_in_flight() == 1
+    # saves follow each other during the edits, instead of restarting on each change
+    assert 2 <= len(writes) <= edit_time / 0.05 + 2
+    assert writes[-1] == "v49"
@@ -0,0 +1,228 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+from jupyter_server_ydoc.schedulers import (
+    AdmissionQueueFull,
+    RoomInitializationScheduler,
+    SaveScheduler,
+    ThreadPoolScheduler,
+)
+
+
+async def test_should_limit_concurrent_initializations():
+    scheduler = RoomInitializationScheduler(2)
+    running = 0
+    max_running = 0
+
+    async def initialize(room_id: str) -> None:
+        nonlocal running, max_running
+        async with scheduler.admit(room_id):
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(initialize(f"room-{i}") for i in range(6)))
+
+    assert max_running == 2
+    assert scheduler.active == 0
+    assert scheduler.queue_depth == 0
+    assert scheduler.admissions == 6
+
+
+async def test_should_admit_clients_of_an_admitted_room():
+    scheduler = RoomInitializationScheduler(1)
+
+    async with scheduler.admit("room"), scheduler.admit("room") as wait_time:
+        assert wait_time == 0
+        assert scheduler.active == 1
+
+
+async def test_should_prefer_rooms_with_more_waiting_clients():
+    scheduler = RoomInitializationScheduler(1)
+    admitted = []
+
+    async def initialize(room_id: str) -> None:
+        async with scheduler.admit(room_id):
+            admitted.append(room_id)
+
+    async with scheduler.admit("room-0"):
+        tasks = [asyncio.create_task(initialize(room_id)) for room_id in ("a", "b", "b")]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 3
+
+    await asyncio.gather(*tasks)
+    assert admitted == ["b", "b", "a"]
+    assert scheduler.metrics["max_wait_time"] > 0
+
+
+async def test_should_reject_clients_when_queue_is_full():
+    scheduler = RoomInitializationScheduler(1, max_queue_size=1)
+
+    async with scheduler.admit("room-0"):
+        task = asyncio.create_task(scheduler._acquire("room-1"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionQueueFull):
+            async with scheduler.admit("room-2"):
+                pass
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert scheduler.rejections == 1
+    assert scheduler.queue_depth == 0
+    assert scheduler.active == 0
+
+
+async def test_should_skip_clients_cancelled_while_waiting():
+    scheduler = RoomInitializationScheduler(1)
+    admitted = []
+
+    async def initialize(room_id: str) -> None:
+        async with scheduler.admit(room_id):
+            admitted.append(room_id)
+
+    async with scheduler.admit("room-0"):
+        cancelled = asyncio.create_task(initialize("room-1"))
+        await asyncio.sleep(0)
+        # the client disconnects while the room ahead of it releases
+        cancelled.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert scheduler.active == 0
+    assert scheduler.queue_depth == 0
+
+    # the next rooms are still admitted
+    await asyncio.wait_for(initialize("room-2"), 1)
+    assert admitted == ["room-2"]
+
+
+async def test_should_limit_concurrent_saves():
+    scheduler = SaveScheduler(2)
+    running = 0
+    max_running = 0
+
+    async def save() -> dict:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"size": 10}
+
+    await asyncio.gather(*(scheduler.save(f"room-{i}", save) for i in range(6)))
+
+    assert max_running == 2
+    assert scheduler.saves == 6
+    assert scheduler.bytes_written == 60
+    assert scheduler.queue_length == 0
+
+
+async def test_should_coalesce_pending_saves_of_a_room():
+    scheduler = SaveScheduler(1)
+    saved = []
+    release = asyncio.Event()
+
+    async def block() -> None:
+        await release.wait()
+
+    def save_version(version: int):
+        async def save() -> dict:
+            saved.append(version)
+            return {"version": version}
+
+        return save
+
+    blocking = asyncio.create_task(scheduler.save("other-room", block))
+    await asyncio.sleep(0)
+    saves = [asyncio.create_task(scheduler.save("room", save_version(i))) for i in range(3)]
+    await asyncio.sleep(0)
+    assert scheduler.queue_length == 1
+
+    release.set()
+    results = await asyncio.gather(blocking, *saves)
+
+    # only the latest save ran, and all callers got its result
+    assert saved == [2]
+    assert results[1:] == [{"version": 2}] * 3
+    assert scheduler.coalesced == 2
+
+
+async def test_should_schedule_saves_fairly_across_rooms():
+    scheduler = SaveScheduler(1)
+    saved = []
+
+    def save_room(room_id: str):
+        async def save() -> None:
+            saved.append(room_id)
+            await asyncio.sleep(0)
+
+        return save
+
+    tasks = [
+        asyncio.create_task(scheduler.save(room_id, save_room(room_id)))
+        for room_id in ("a", "b", "a", "a", "a", "c")
+    ]
+    await asyncio.gather(*tasks)
+
+    # a room only has one pending save, its next saves don't delay the other rooms
+    assert saved == ["a", "b", "a", "c"]
+
+
+async def test_should_raise_save_errors_to_callers():
+    scheduler = SaveScheduler(1)
+
+    async def save() -> None:
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        await scheduler.save("room", save)
+
+    assert scheduler.failures == 1
+
+
+async def test_should_run_blocking_calls_in_a_bounded_thread_pool():
+    scheduler = ThreadPoolScheduler(2)
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def call(value: int) -> int:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return value
+
+    def fail() -> None:
+        raise OSError("disk full")
+
+    try:
+        results = await asyncio.gather(*(scheduler.run(call, i) for i in range(6)))
+
+        with pytest.raises(OSError):
+            await scheduler.run(fail)
+    finally:
+        scheduler.shutdown()
+
+    assert results == list(range(6))
+    assert max_running == 2
+    assert scheduler.calls == 7
+    assert scheduler.failures == 1
+    assert scheduler.queue_length == 0
+    # the last calls waited for the first ones
+    assert scheduler.metrics["max_wait_time"] >= 0.03
+    assert scheduler.metrics["max_latency"] >= 0.05
@@ -0,0 +1,122 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from jupyter_server_ydoc.stores import SQLiteYStore
+from pycrdt import Doc, Text
+from traitlets import TraitError
+
+
+def _create_updates(count: int) -> list[bytes]:
+    ydoc = Doc()
+    ydoc["source"] = text = Text()
+    updates: list[bytes] = []
+    ydoc.observe(lambda event: updates.append(event.update))
+    for _ in range(count):
+        text += "a"
+    return updates
+
+
+async def _start(store: SQLiteYStore) -> None:
+    asyncio.create_task(store.start())
+    await store.started.wait()
+    await store.db_initialized.wait()
+
+
+async def test_sqlite_ystore_should_write_updates_in_batches(tmp_path):
+    db_path = str(tmp_path / "ystore.db")
+    store = SQLiteYStore(
+        path="file:test-id", db_path=db_path, write_batch_delay=0.05, write_batch_size=10
+    )
+    await _start(store)
+    try:
+        for update in _create_updates(25):
+            await store.write(update)
+
+        # the full batches are written right away, the rest after the delay
+        assert store.flushes == 2
+        await asyncio.sleep(0.2)
+        assert store.flushes == 3
+        assert store.batched_updates == 25
+    finally:
+        await store.stop()
+
+    reader = SQLiteYStore(path="file:test-id", db_path=db_path)
+    await _start(reader)
+    try:
+        updates = [update async for update, *_ in reader.read()]
+        assert len(updates) == 3
+        ydoc = Doc()
+        await reader.apply_updates(ydoc)
+        assert str(ydoc.get("source", type=Text)) == "a" * 25
+    finally:
+        await reader.stop()
+
+
+async def test_sqlite_ystore_should_write_pending_updates_when_stopped(tmp_path):
+    db_path = str(tmp_path / "ystore.db")
+    store = SQLiteYStore(path="file:test-id", db_path=db_path, write_batch_delay=60)
+    await _start(store)
+    for update in _create_updates(5):
+        await store.write(update)
+    assert store.flushes == 0
+    await store.stop()
+
+    reader = SQLiteYStore(path="file:test-id", db_path=db_path)
+    await _start(reader)
+    try:
+        ydoc = Doc()
+        await reader.apply_updates(ydoc)
+        assert str(ydoc.get("source", type=Text)) == "a" * 5
+    finally:
+        await reader.stop()
+
+
+async def test_sqlite_ystores_should_share_a_connection_in_wal_mode(tmp_path):
+    db_path = str(tmp_path / "ystore.db")
+    stores = [SQLiteYStore(path=f"file:test-{i}", db_path=db_path) for i in range(3)]
+    for store in stores:
+        await _start(store)
+
+    connection = stores[0]._db
+    assert all(store._db is connection for store in stores)
+    cursor = await connection.cursor()
+    await cursor.execute("PRAGMA journal_mode")
+    assert (await cursor.fetchone())[0] == "wal"
+
+    # the updates of the documents are written concurrently through the shared connection
+    updates = _create_updates(10)
+    await asyncio.gather(*(store.write(update) for store in stores for update in updates))
+    for store in stores[:-1]:
+        await store.stop()
+
+    # the connection is kept open for the last store
+    ydoc = Doc()
+    await stores[-1].apply_updates(ydoc)
+    assert str(ydoc.get("source", type=Text)) == "a" * 10
+    await stores[-1].stop()
+    assert db_path not in SQLiteYStore._databases
+
+
+async def test_sqlite_ystores_should_not_share_a_connection_if_disabled(tmp_path):
+    db_path = str(tmp_path / "ystore.db")
+    stores = [
+        SQLiteYStore(path=f"file:test-{i}", db_path=db_path, shared_connection=False)
+        for i in range(2)
+    ]
+    for store in stores:
+        await _start(store)
+    try:
+        assert stores[0]._db is not stores[1]._db
+    finally:
+        for store in stores:
+            await store.stop()
+
+
+def test_sqlite_ystore_should_reject_unknown_journal_modes(tmp_path):
+    with pytest.raises(TraitError):
+        SQLiteYStore(path="file:test-id", journal_mode="WAL; DROP TABLE yupdates")
@@ -0,0 +1,135 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+from time import monotonic
+
+import pytest
+from jupyter_server.services.contents.filemanager import AsyncFileContentsManager
+from jupyter_server_ydoc.loaders import FileLoaderMapping
+from jupyter_server_ydoc.test_utils import FakeFileIDManager
+from jupyter_server_ydoc.watchers import WatchfilesFileWatcher
+
+pytest.importorskip("watchfiles")
+
+
+async def test_watchfiles_watcher_should_notify_watched_files(tmp_path):
+    root_dir = tmp_path / "files"
+    root_dir.mkdir()
+    watched = root_dir / "watched.txt"
+    watched.write_text("test")
+    changes: asyncio.Queue[set[str]] = asyncio.Queue()
+    watcher = WatchfilesFileWatcher(changes.put_nowait)
+
+    watcher.watch(str(watched))
+    await asyncio.sleep(0.1)
+    try:
+        (root_dir / "other.txt").write_text("test")
+        start = monotonic()
+        watched.write_text("changed")
+
+        assert await asyncio.wait_for(changes.get(), 1) == {str(watched)}
+        assert monotonic() - start < 0.5
+        assert changes.empty()
+    finally:
+        await watcher.stop()
+
+
+async def test_FileLoaderMapping_should_notify_changes_from_watcher(tmp_path):
+    root_dir = tmp_path / "files"
+    root_dir.mkdir()
+    cm = AsyncFileContentsManager(root_dir=str(root_dir))
+    await cm.save({"type": "file", "format": "text", "content": "test"}, "test.txt")
+
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager({"file-1": "test.txt"})},
+        file_poll_interval=60,
+        file_watcher_class=WatchfilesFileWatcher,
+    )
+    loader = map["file-1"]
+    await loader.load_content("text", "file")
+    triggered = asyncio.Event()
+
+    async def trigger():
+        triggered.set()
+
+    loader.observe("test", trigger)
+    await asyncio.sleep(0.1)
+
+    try:
+        # the file isn't polled
+        assert map.metrics["watched_files"] == 1
+        assert map.metrics["polled_files"] == 0
+
+        start = monotonic()
+        await cm.save({"type": "file", "format": "text", "content": "changed"}, "test.txt")
+        await asyncio.wait_for(triggered.wait(), 1)
+
+        # detected long before the poll interval
+        assert monotonic() - start < 0.5
+        assert map.metrics["checked_files"] == 1
+    finally:
+        await map.clear()
+
+
+async def test_watchfiles_watcher_should_notify_watched_files_when_restarted(tmp_path):
+    watched = []
+    for name in ("first", "second"):
+        (tmp_path / name).mkdir()
+        watched.append(tmp_path / name / "watched.txt")
+        watched[-1].write_text("test")
+    changes: asyncio.Queue[set[str]] = asyncio.Queue()
+    watcher = WatchfilesFileWatcher(changes.put_nowait)
+
+    watcher.watch(str(watched[0]))
+    await asyncio.sleep(0.1)
+    try:
+        # the changes of the first file during the restart would be missed
+        watcher.watch(str(watched[1]))
+
+        assert await asyncio.wait_for(changes.get(), 1) == {str(path) for path in watched}
+        # the files are notified once the new watch is running
+        watched[1].write_text("changed")
+        assert await asyncio.wait_for(changes.get(), 1) == {str(watched[1])}
+    finally:
+        await watcher.stop()
+
+
+class FailingFileWatcher(WatchfilesFileWatcher):
+    def _notify(self, changes):
+        raise OSError("Too many open files")
+
+
+async def test_FileLoaderMapping_should_poll_files_when_watcher_fails(tmp_path):
+    root_dir = tmp_path / "files"
+    root_dir.mkdir()
+    cm = AsyncFileContentsManager(root_dir=str(root_dir))
+    await cm.save({"type": "file", "format": "text", "content": "test"}, "test.txt")
+
+    map = FileLoaderMapping(
+        {"contents_manager": cm, "file_id_manager": FakeFileIDManager({"file-1": "test.txt"})},
+        file_poll_interval=0.1,
+        file_watcher_class=FailingFileWatcher,
+    )
+    loader = map["file-1"]
+    await loader.load_content("text", "file")
+    triggered = asyncio.Event()
+
+    async def trigger():
+        triggered.set()
+
+    loader.observe("test", trigger)
+    await asyncio.sleep(0.1)
+
+    try:
+        assert map.metrics["watched_files"] == 1
+        await cm.save({"type": "file", "format": "text", "content": "changed"}, "test.txt")
+
+        # the change missed by the failed watcher is polled
+        await asyncio.wait_for(triggered.wait(), 1)
+        assert map.metrics["watched_files"] == 0
+        assert map.metrics["polled_files"] == 1
+    finally:
+        await map.clear()